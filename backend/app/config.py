@@ -9,9 +9,42 @@ class Settings(BaseSettings):
     DEBUG: bool = True
 
     # Ollama settings
+    # OLLAMA_BASE_URL accepts a comma-separated pool of endpoints for generation.
+    # OLLAMA_EMBEDDING_BASE_URL optionally routes embeddings to a separate pool
+    # (empty = use the generation pool).
     OLLAMA_BASE_URL: str = "http://localhost:11434"
+    OLLAMA_EMBEDDING_BASE_URL: str = ""
     DEFAULT_MODEL: str = "qwen3:1.7b"
 
+    # Ollama pool routing
+    # OLLAMA_MAX_FAILURES: consecutive connection failures before a node is ejected
+    # OLLAMA_EJECT_SECONDS: how long a node stays ejected before it is re-probed
+    # OLLAMA_AFFINITY_BONUS: in-flight requests a node may carry extra and still
+    #   be preferred for a model it has already loaded
+    OLLAMA_MAX_FAILURES: int = 3
+    OLLAMA_EJECT_SECONDS: float = 30.0
+    OLLAMA_AFFINITY_BONUS: int = 2
+
+    # Backend timeouts and circuit breaking
+    # OLLAMA_*_TIMEOUT: per-request timeout in seconds for each backend
+    # OLLAMA_MAX_CONCURRENCY: worker threads per backend (calls beyond this queue)
+    # CIRCUIT_FAILURE_THRESHOLD: consecutive failures (errors, timeouts or calls
+    #   slower than CIRCUIT_*_LATENCY_SECONDS) before a backend's circuit opens
+    # CIRCUIT_RESET_SECONDS: how long the circuit stays open before a trial call
+    # DEGRADED_MODE: what /api/chat does while generation is unavailable:
+    #   "snippets" answers with the top retrieved resume excerpts (marked
+    #   degraded), "fail_fast" returns 503 immediately
+    OLLAMA_GENERATION_TIMEOUT: float = 120.0
+    OLLAMA_EMBEDDING_TIMEOUT: float = 15.0
+    OLLAMA_HEALTH_TIMEOUT: float = 2.0
+    OLLAMA_MAX_CONCURRENCY: int = 8
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SECONDS: float = 30.0
+    CIRCUIT_GENERATION_LATENCY_SECONDS: float = 60.0
+    CIRCUIT_EMBEDDING_LATENCY_SECONDS: float = 5.0
+    DEGRADED_MODE: str = "snippets"
+    DEGRADED_SNIPPETS: int = 3
+
     # Available models configuration
     # Format: "model_name:display_name:description"
     AVAILABLE_MODELS: List[str] = [
@@ -28,10 +61,54 @@ class Settings(BaseSettings):
     CHUNK_OVERLAP: int = 100
     TOP_K_RESULTS: int = 5
 
+    # Batch question answering (/api/chat/batch)
+    BATCH_MAX_QUESTIONS: int = 100
+    BATCH_MAX_CONCURRENCY: int = 4
+
+    # Server-side chat sessions
+    # SESSION_TTL_SECONDS: idle time before a session expires
+    # SESSION_MAX_SESSIONS: sessions kept in memory; least recently used beyond this
+    #   are spilled to SESSION_SQLITE_PATH (or dropped if it is empty)
+    # SESSION_MAX_HISTORY_MESSAGES: history messages kept and sent to the model
+    # SESSION_MAX_CACHED_QUERIES: question embeddings/results cached per session
+    SESSION_TTL_SECONDS: float = 1800.0
+    SESSION_MAX_SESSIONS: int = 1000
+    SESSION_SQLITE_PATH: str = ""
+    SESSION_MAX_HISTORY_MESSAGES: int = 20
+    SESSION_MAX_CACHED_QUERIES: int = 20
+
+    # Admin / profiling
+    # ADMIN_TOKEN: required in the X-Admin-Token header for /api/admin/*;
+    #   empty disables the admin endpoints entirely
+    # SLOW_REQUEST_THRESHOLD_MS: requests slower than this keep a stage breakdown
+    # SLOW_REQUEST_BUFFER_SIZE: how many slow requests the ring buffer retains
+    # PROFILE_MAX_SECONDS: upper bound on a single profile capture
+    ADMIN_TOKEN: str = ""
+    SLOW_REQUEST_THRESHOLD_MS: int = 2000
+    SLOW_REQUEST_BUFFER_SIZE: int = 200
+    PROFILE_MAX_SECONDS: float = 300.0
+
+    # Quantized retrieval
+    # VECTOR_QUANTIZATION: "none" (query Chroma directly), "int8" or "binary".
+    #   Quantized modes keep compact codes in RAM and rescore candidates with
+    #   full-precision vectors memory-mapped from disk.
+    # QUANTIZATION_RESCORE_FACTOR: candidates rescored per requested result
+    VECTOR_QUANTIZATION: str = "none"
+    QUANTIZATION_RESCORE_FACTOR: int = 4
+
     # Paths
     RESUME_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "resume")
     VECTORSTORE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vectorstore")
 
+    # Collections (one per portfolio)
+    # DEFAULT_COLLECTION uses RESUME_DIR / VECTORSTORE_DIR and is always loaded.
+    # Other collections live in COLLECTIONS_DIR/<name>/{resume,vectorstore}, load on
+    # first use and are evicted least-recently-used once the estimated memory of
+    # loaded collections exceeds COLLECTION_MEMORY_BUDGET_MB.
+    DEFAULT_COLLECTION: str = "default"
+    COLLECTIONS_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "collections")
+    COLLECTION_MEMORY_BUDGET_MB: int = 512
+
     # Embedding model (using Ollama)
     # nomic-embed-text is optimized for embedding tasks
     EMBEDDING_MODEL: str = "nomic-embed-text"
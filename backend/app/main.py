@@ -8,8 +8,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.routers import chat
+from app.routers import chat, admin
 from app.services.rag_service import rag_service
+from app.services.ollama_pool import generation_pool, embedding_pool
+from app.services.profiling_service import ProfilingMiddleware, profiling_service
+from app.services.session_service import session_store
 
 
 @asynccontextmanager
@@ -24,10 +27,19 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ RAG service initialization warning: {e}")
 
+    # Re-probe ejected Ollama nodes in the background
+    pools = (generation_pool, embedding_pool)
+    for pool in pools:
+        pool.start_health_checks()
+
     yield
 
     # Cleanup on shutdown
     print("👋 Shutting down...")
+    for pool in pools:
+        await pool.stop_health_checks()
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+    session_store.close()
 
 
 app = FastAPI(
@@ -46,8 +58,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stage timings for slow-request sampling and request-count-bounded profiles
+app.add_middleware(ProfilingMiddleware, service=profiling_service)
+
 # Include routers
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 
 @app.get("/")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -12,12 +12,49 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="User's question")
     model: str = Field(default="llama3.2", description="Model to use for generation")
     chat_history: List[ChatMessage] = Field(default=[], description="Previous chat messages for context")
+    collection: Optional[str] = Field(default=None, description="Resume collection to query (default collection if omitted)")
+    session_id: Optional[str] = Field(default=None, description="Server-side session; history is kept on the server and chat_history is ignored")
 
 
 class ChatResponse(BaseModel):
     answer: str = Field(..., description="Generated answer")
     model: str = Field(..., description="Model used for generation")
     sources: List[str] = Field(default=[], description="Source documents used")
+    session_id: Optional[str] = Field(default=None, description="Session the turn was added to")
+    degraded: bool = Field(default=False, description="True if the model was unavailable and the answer is retrieved resume snippets only")
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+
+class SessionCreateRequest(BaseModel):
+    collection: Optional[str] = Field(default=None, description="Collection the session queries (default collection if omitted)")
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    collection: str
+    history: List[ChatMessage] = Field(default=[])
+    expires_in: float = Field(..., description="Seconds until the session expires if left idle")
+
+
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, description="Questions to answer")
+    model: str = Field(default="llama3.2", description="Model to use for generation")
+    collection: Optional[str] = Field(default=None, description="Resume collection to query (default collection if omitted)")
+    stream: bool = Field(default=False, description="Stream results as NDJSON in completion order")
+
+
+class BatchChatResult(BaseModel):
+    index: int = Field(..., description="Position of the question in the request")
+    question: str
+    answer: str = Field(default="", description="Generated answer (empty on error)")
+    sources: List[str] = Field(default=[], description="Source documents used")
+    degraded: bool = Field(default=False, description="True if the answer is retrieved resume snippets only")
+    error: Optional[str] = Field(default=None, description="Error message if generation failed")
+
+
+class BatchChatResponse(BaseModel):
+    model: str
+    results: List[BatchChatResult] = Field(..., description="Results in input order")
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
@@ -34,19 +71,71 @@ class ModelsResponse(BaseModel):
 
 
 class DocumentUploadResponse(BaseModel):
+    collection: str
     filename: str
     status: str
     message: str
 
 
 class IndexResponse(BaseModel):
+    collection: str
     status: str
     documents_indexed: int
     message: str
 
 
+class OllamaNodeStatus(BaseModel):
+    base_url: str
+    healthy: bool
+    in_flight: int
+    failures: int
+    loaded_models: List[str] = Field(default=[])
+
+
+class CircuitStatus(BaseModel):
+    state: str = Field(..., description="'closed', 'open' or 'half_open'")
+    failures: int = Field(..., description="Consecutive failures")
+    retry_after: float = Field(..., description="Seconds until the next trial call while open")
+
+
 class HealthResponse(BaseModel):
     status: str
     ollama_connected: bool
     vectorstore_ready: bool
     documents_loaded: int
+    generation_nodes: List[OllamaNodeStatus] = Field(default=[], description="Generation pool node status")
+    embedding_nodes: List[OllamaNodeStatus] = Field(default=[], description="Embedding pool node status")
+    generation_circuit: Optional[CircuitStatus] = Field(default=None, description="Generation backend circuit breaker")
+    embedding_circuit: Optional[CircuitStatus] = Field(default=None, description="Embedding backend circuit breaker")
+
+
+class ProfileStartRequest(BaseModel):
+    mode: str = Field(default="sampling", description="'sampling' (all threads, collapsed stacks) or 'cprofile' (event loop, pstats)")
+    requests: Optional[int] = Field(default=None, ge=1, description="Stop after this many requests")
+    seconds: Optional[float] = Field(default=None, gt=0, description="Stop after this many seconds")
+    interval_ms: float = Field(default=5.0, ge=1, description="Sampling interval (sampling mode only)")
+
+
+class ProfileStatusResponse(BaseModel):
+    mode: str
+    running: bool
+    requests_seen: int
+    max_requests: Optional[int] = None
+    max_seconds: Optional[float] = None
+    started_at: str
+    finished_at: Optional[str] = None
+
+
+class SlowRequest(BaseModel):
+    timestamp: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    stages_ms: Dict[str, float] = Field(default={}, description="Time per stage; '<stage>.executor_wait' is time queued for a worker thread")
+    unaccounted_ms: float = Field(..., description="Time outside traced stages (routing, validation, serialization)")
+
+
+class SlowRequestsResponse(BaseModel):
+    threshold_ms: int
+    requests: List[SlowRequest]
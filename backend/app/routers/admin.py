@@ -0,0 +1,111 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response
+
+from app.config import settings
+from app.models.schemas import (
+    ProfileStartRequest,
+    ProfileStatusResponse,
+    SlowRequestsResponse
+)
+from app.services.profiling_service import profiling_service
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Admin endpoints are hidden unless ADMIN_TOKEN is set, and need it in X-Admin-Token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("/profile", response_model=ProfileStatusResponse)
+async def start_profile(request: ProfileStartRequest):
+    """
+    Start profiling the next N requests and/or the next T seconds
+
+    Fetch the result from /api/admin/profile/result once the capture has stopped.
+    """
+    try:
+        capture = profiling_service.start_capture(
+            mode=request.mode,
+            requests=request.requests,
+            seconds=request.seconds,
+            interval_ms=request.interval_ms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return capture.status()
+
+
+@router.get("/profile", response_model=ProfileStatusResponse)
+async def profile_status():
+    """Status of the current or last profile capture"""
+    if profiling_service.capture is None:
+        raise HTTPException(status_code=404, detail="No profile has been captured")
+    return profiling_service.capture.status()
+
+
+@router.delete("/profile", response_model=ProfileStatusResponse)
+async def stop_profile():
+    """Stop the running capture early"""
+    capture = profiling_service.stop_capture()
+    if capture is None:
+        raise HTTPException(status_code=404, detail="No profile has been captured")
+    return capture.status()
+
+
+@router.get("/profile/result")
+async def profile_result(
+    format: str = Query(default="collapsed", description="'collapsed' (sampling), 'pstats' or 'text' (cprofile)")
+):
+    """
+    Download the last profile
+
+    - collapsed: one "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope
+    - pstats: marshalled stats, load with pstats.Stats(<file>)
+    - text: top functions by cumulative time
+    """
+    capture = profiling_service.capture
+    if capture is None:
+        raise HTTPException(status_code=404, detail="No profile has been captured")
+    if capture.running:
+        raise HTTPException(status_code=409, detail="Profile capture is still running")
+
+    try:
+        body = capture.result(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "pstats":
+        return Response(
+            content=body,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="profile.pstats"'}
+        )
+    return Response(content=body, media_type="text/plain")
+
+
+@router.get("/slow-requests", response_model=SlowRequestsResponse)
+async def slow_requests(limit: Optional[int] = Query(default=None, ge=1)):
+    """Stage breakdowns of recent requests slower than SLOW_REQUEST_THRESHOLD_MS, newest first"""
+    return SlowRequestsResponse(
+        threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+        requests=profiling_service.get_slow_requests(limit)
+    )
+
+
+@router.delete("/slow-requests")
+async def clear_slow_requests():
+    """Empty the slow request buffer"""
+    cleared = len(profiling_service.slow_requests)
+    profiling_service.slow_requests.clear()
+    return {"cleared": cleared}
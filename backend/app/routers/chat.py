@@ -1,36 +1,103 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import math
 import os
 import shutil
+from typing import Optional
 
 from app.config import settings
 from app.models.schemas import (
     ChatRequest,
     ChatResponse,
+    SessionCreateRequest,
+    SessionResponse,
+    BatchChatRequest,
+    BatchChatResult,
+    BatchChatResponse,
     ModelsResponse,
     DocumentUploadResponse,
     IndexResponse,
     HealthResponse
 )
+from app.services.circuit_breaker import BackendUnavailableError
 from app.services.llm_service import llm_service
-from app.services.rag_service import rag_service
-from app.services.document_service import document_service
+from app.services.rag_service import RAGService, rag_service
+from app.services.collection_service import CollectionNotFoundError, collection_manager
+from app.services.ollama_pool import generation_pool, embedding_pool
+from app.services.session_service import ChatSession, session_store
 
 
 router = APIRouter()
 
 
+async def get_collection(name: Optional[str], create: bool = False) -> RAGService:
+    """Resolve a collection name, mapping lookup errors to HTTP errors"""
+    try:
+        return await collection_manager.get(name, create=create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def backend_unavailable(e: BackendUnavailableError) -> HTTPException:
+    """503 with a Retry-After hint when a model backend is down or its circuit is open"""
+    retry_after = e.retry_after or settings.CIRCUIT_RESET_SECONDS
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
+    )
+
+
+def check_generation_available():
+    """
+    With DEGRADED_MODE=fail_fast, 503 before any embedding or retrieval
+    while the generation circuit is open
+    """
+    if settings.DEGRADED_MODE == "snippets":
+        return
+    try:
+        llm_service.pool.breaker.fail_fast()
+    except BackendUnavailableError as e:
+        raise backend_unavailable(e)
+
+
+async def get_session(session_id: str) -> ChatSession:
+    session = await session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+def session_response(session: ChatSession) -> SessionResponse:
+    return SessionResponse(
+        session_id=session.session_id,
+        collection=session.collection,
+        history=session.history,
+        expires_in=session_store.ttl
+    )
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Check the health status of all services"""
     ollama_connected = await llm_service.check_connection()
+    await embedding_pool.probe()
     stats = rag_service.get_stats()
+    circuits_closed = all(
+        pool.breaker.state == pool.breaker.CLOSED for pool in (generation_pool, embedding_pool)
+    )
 
     return HealthResponse(
-        status="healthy" if ollama_connected else "degraded",
+        status="healthy" if ollama_connected and circuits_closed else "degraded",
         ollama_connected=ollama_connected,
         vectorstore_ready=stats["vectorstore_ready"],
-        documents_loaded=stats["documents_count"]
+        documents_loaded=stats["documents_count"],
+        generation_nodes=generation_pool.get_stats(),
+        embedding_nodes=embedding_pool.get_stats(),
+        generation_circuit=generation_pool.breaker.get_stats(),
+        embedding_circuit=embedding_pool.breaker.get_stats()
     )
 
 
@@ -54,55 +121,215 @@ async def chat(request: ChatRequest):
     1. Search for relevant resume content
     2. Use that content as context for the LLM
     3. Generate a response based on the resume
+
+    With a session_id, history and retrieved context are kept on the server,
+    so follow-up turns only need to send the new message.
+
+    While the model backend is down (or its circuit is open) the response is
+    either retrieval-only ("degraded": true) or a 503, see DEGRADED_MODE.
     """
+    session = None
+    collection = request.collection
+    if request.session_id:
+        session = await get_session(request.session_id)
+        if collection and collection != session.collection:
+            raise HTTPException(status_code=400, detail="Session belongs to a different collection")
+        collection = session.collection
+
+    service = await get_collection(collection)
+    check_generation_available()
+
     try:
         # Use RAG to answer the question
-        answer, sources = await rag_service.query(
-            question=request.message,
-            model=request.model
-        )
+        async with collection_manager.use(service.name) as service:
+            if session is not None:
+                answer, sources, degraded = await service.query_session(
+                    session=session,
+                    question=request.message,
+                    model=request.model
+                )
+            else:
+                answer, sources, degraded = await service.query(
+                    question=request.message,
+                    model=request.model
+                )
 
         return ChatResponse(
             answer=answer,
             model=request.model,
-            sources=sources
+            sources=sources,
+            session_id=session.session_id if session else None,
+            degraded=degraded
+        )
+
+    except BackendUnavailableError as e:
+        raise backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/sessions", response_model=SessionResponse)
+async def create_session(request: SessionCreateRequest):
+    """Start a server-side chat session bound to a collection"""
+    service = await get_collection(request.collection)
+    return session_response(await session_store.create(service.name))
+
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+async def read_session(session_id: str):
+    """Get a session's recent history"""
+    return session_response(await get_session(session_id))
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and discard its state"""
+    if not await session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session_id, "status": "deleted"}
+
+
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """
+    Answer a batch of questions against one collection
+
+    All questions are embedded and retrieved together, then answered with
+    bounded concurrency. With "stream": true, results are streamed as NDJSON
+    lines in completion order (each carries its input index); otherwise they
+    are returned in input order.
+    """
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions: {len(request.questions)} (max {settings.BATCH_MAX_QUESTIONS})"
         )
 
+    service = await get_collection(request.collection)
+    check_generation_available()
+
+    # Retrieve before streaming so a failed embedding backend still gets a 503
+    try:
+        async with collection_manager.use(service.name) as collection:
+            search_results = await collection.search_batch(request.questions)
+    except BackendUnavailableError as e:
+        raise backend_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def results():
+        async for index, answer, sources, degraded, error in collection.query_batch(
+            questions=request.questions,
+            model=request.model,
+            search_results=search_results
+        ):
+            yield BatchChatResult(
+                index=index,
+                question=request.questions[index],
+                answer=answer,
+                sources=sources,
+                degraded=degraded,
+                error=error
+            )
+
+    if request.stream:
+        async def ndjson():
+            pending = set(range(len(request.questions)))
+            try:
+                async for result in results():
+                    pending.discard(result.index)
+                    yield result.model_dump_json() + "\n"
+            except BackendUnavailableError as e:
+                # The status is already sent: report the rest of the batch per item
+                for index in sorted(pending):
+                    yield BatchChatResult(
+                        index=index,
+                        question=request.questions[index],
+                        error=str(e)
+                    ).model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        ordered = sorted([result async for result in results()], key=lambda r: r.index)
+    except BackendUnavailableError as e:
+        raise backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return BatchChatResponse(model=request.model, results=ordered)
+
 
 @router.post("/chat/stream")
 async def chat_stream(request: ChatRequest):
-    """Stream chat response (for real-time output)"""
+    """
+    Stream chat response (for real-time output)
 
-    async def generate():
-        # First, get relevant context
-        search_results = await rag_service.search(request.message)
+    If generation is unavailable before the first chunk (circuit open, node
+    down or timed out), returns the retrieval-only answer in one piece with
+    an "X-Degraded: retrieval-only" header (or a 503 with DEGRADED_MODE=fail_fast).
+    Sessions are not supported here; use /api/chat for them.
+    """
 
-        context_parts = []
-        for doc, score in search_results:
-            context_parts.append(doc.page_content)
+    if request.session_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Sessions are not supported on /api/chat/stream; use /api/chat"
+        )
 
-        context = "\n\n---\n\n".join(context_parts) if context_parts else ""
+    service = await get_collection(request.collection)
+    check_generation_available()
 
-        system_prompt = """You are a helpful assistant that answers questions about a person's resume/CV.
+    # Retrieve before streaming so a failed embedding backend still gets a 503
+    try:
+        async with collection_manager.use(service.name) as collection:
+            search_results = await collection.search(request.message)
+    except BackendUnavailableError as e:
+        raise backend_unavailable(e)
+
+    context_parts = []
+    for doc, score in search_results:
+        context_parts.append(doc.page_content)
+
+    context = "\n\n---\n\n".join(context_parts) if context_parts else ""
+
+    system_prompt = """You are a helpful assistant that answers questions about a person's resume/CV.
 Answer based ONLY on the provided context. If the information is not in the context, say so.
 Be concise but informative. Answer in the same language as the question."""
 
-        async for chunk in llm_service.generate_stream(
-            prompt=request.message,
-            model=request.model,
-            system_prompt=system_prompt,
-            context=context
-        ):
+    stream = llm_service.generate_stream(
+        prompt=request.message,
+        model=request.model,
+        system_prompt=system_prompt,
+        context=context
+    )
+
+    # Wait for the first chunk so backend failures can still change the status
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except BackendUnavailableError as e:
+        if settings.DEGRADED_MODE != "snippets":
+            raise backend_unavailable(e)
+        return PlainTextResponse(
+            RAGService.snippet_answer(search_results),
+            headers={"X-Degraded": "retrieval-only"}
+        )
+
+    async def generate():
+        yield first
+        async for chunk in stream:
             yield chunk
 
     return StreamingResponse(generate(), media_type="text/plain")
 
 
 @router.post("/documents/upload", response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    collection: Optional[str] = Query(default=None, description="Collection to upload into (created if missing)")
+):
     """Upload a resume document (PDF, TXT, or Markdown)"""
     # Validate file type
     allowed_extensions = [".pdf", ".txt", ".md", ".markdown"]
@@ -114,19 +341,22 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
         )
 
-    # Save file
-    file_path = os.path.join(settings.RESUME_DIR, file.filename)
+    service = await get_collection(collection, create=True)
+
+    # Save file (basename only, so uploads stay inside the collection)
+    file_path = os.path.join(service.resume_dir, os.path.basename(file.filename))
 
     try:
-        os.makedirs(settings.RESUME_DIR, exist_ok=True)
+        os.makedirs(service.resume_dir, exist_ok=True)
 
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
 
         return DocumentUploadResponse(
+            collection=service.name,
             filename=file.filename,
             status="success",
-            message=f"File uploaded successfully. Run /api/documents/index to update the search index."
+            message=f"File uploaded successfully. Run /api/documents/index?collection={service.name} to update the search index."
         )
 
     except Exception as e:
@@ -134,35 +364,57 @@ async def upload_document(file: UploadFile = File(...)):
 
 
 @router.post("/documents/index", response_model=IndexResponse)
-async def index_documents():
-    """Re-index all documents in the resume directory"""
+async def index_documents(
+    collection: Optional[str] = Query(default=None, description="Collection to re-index")
+):
+    """Re-index all documents in the collection's resume directory"""
+    service = await get_collection(collection)
+
     try:
-        chunks_indexed = await rag_service.index_documents()
+        async with collection_manager.use(service.name) as service:
+            chunks_indexed = await service.index_documents()
 
         if chunks_indexed == 0:
             return IndexResponse(
+                collection=service.name,
                 status="warning",
                 documents_indexed=0,
                 message="No documents found to index. Please upload documents first."
             )
 
         return IndexResponse(
+            collection=service.name,
             status="success",
             documents_indexed=chunks_indexed,
             message=f"Successfully indexed {chunks_indexed} document chunks."
         )
 
+    except BackendUnavailableError as e:
+        raise backend_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error indexing documents: {e}")
 
 
 @router.get("/documents")
-async def list_documents():
-    """List all documents in the resume directory"""
-    stats = rag_service.get_stats()
+async def list_documents(
+    collection: Optional[str] = Query(default=None, description="Collection to list")
+):
+    """List all documents in the collection's resume directory"""
+    service = await get_collection(collection)
+    stats = service.get_stats()
 
     return {
+        "collection": service.name,
         "documents": stats["documents"],
         "total_count": stats["documents_count"],
         "chunks_indexed": stats["chunks_count"]
     }
+
+
+@router.get("/collections")
+async def list_collections():
+    """List collections on disk and which of them are currently loaded"""
+    return {
+        "collections": collection_manager.list_collections(),
+        **collection_manager.get_stats()
+    }
@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+class BackendUnavailableError(Exception):
+    """A model backend cannot serve the request right now"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(BackendUnavailableError):
+    """Raised without calling the backend while its circuit is open"""
+
+
+class BackendTimeoutError(BackendUnavailableError):
+    """Raised when a backend call exceeds its timeout"""
+
+
+class BackendConnectionError(BackendUnavailableError):
+    """Raised when no node of a backend could be reached"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one backend
+
+    closed: calls go through. Errors and calls slower than the latency
+        threshold count as failures; any healthy call resets the count.
+    open: after `failure_threshold` consecutive failures, calls fail
+        immediately with CircuitOpenError for `reset_seconds`.
+    half_open: after that, a single trial call is let through; success
+        closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        latency_threshold: Optional[float] = None,
+        is_neutral: Optional[Callable[[Exception], bool]] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.latency_threshold = latency_threshold
+        # Errors that prove the backend answered (e.g. unknown model) and count as success
+        self.is_neutral = is_neutral or (lambda e: False)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.reset_seconds - time.monotonic(), 0.0)
+
+    def allows_calls(self) -> bool:
+        """True unless the circuit is open and not yet due for a trial call"""
+        with self._lock:
+            return self.state != self.OPEN or self.retry_after() <= 0
+
+    def _open_error(self) -> CircuitOpenError:
+        return CircuitOpenError(
+            f"{self.name} backend unavailable (circuit open)",
+            retry_after=self.retry_after() or self.reset_seconds
+        )
+
+    def fail_fast(self):
+        """
+        Raise CircuitOpenError if calls are not allowed, without taking the
+        half-open trial slot; lets callers skip queueing for a worker thread
+        """
+        if not self.allows_calls():
+            raise self._open_error()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN and self.retry_after() <= 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._trial_in_flight):
+                raise self._open_error()
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = True
+
+    def record_success(self, elapsed: Optional[float] = None):
+        if self.latency_threshold is not None and elapsed is not None and elapsed > self.latency_threshold:
+            self.record_failure(reason=f"slow call ({elapsed:.1f}s)")
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"✅ {self.name} circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, reason: str = "error"):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ {self.name} circuit opened after {self.failures} failures (last: {reason})")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open trial slot without a verdict (e.g. cancelled call)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    @contextmanager
+    def guard(self, track_latency: bool = True) -> Iterator[None]:
+        """
+        Wrap one backend call: fail fast when open, record the outcome otherwise
+
+        Pass track_latency=False for calls whose duration says nothing about
+        backend health (e.g. a stream the client reads slowly).
+        """
+        self.before_call()
+        start = time.monotonic()
+        outcome = None
+        try:
+            yield
+            outcome = "success"
+        except Exception as e:
+            if self.is_neutral(e):
+                outcome = "neutral"
+            else:
+                outcome = "failure"
+                self.record_failure(reason=type(e).__name__)
+            raise
+        finally:
+            if outcome == "success":
+                self.record_success(time.monotonic() - start if track_latency else None)
+            elif outcome == "neutral":
+                self.record_success()
+            elif outcome is None:
+                self.release()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_after": round(self.retry_after(), 1) if self.state == self.OPEN else 0.0,
+            }
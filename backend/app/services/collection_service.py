@@ -0,0 +1,136 @@
+import os
+import re
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.services.rag_service import RAGService, rag_service
+
+
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class CollectionNotFoundError(Exception):
+    """Raised when a collection has no directory on disk"""
+
+
+class CollectionManager:
+    """
+    Namespaced RAG collections with lazy loading and LRU eviction
+
+    Each collection has its own document dir, vectorstore and quantized index.
+    Collections are loaded on first use; when the estimated memory of loaded
+    collections exceeds the budget, the least recently used idle collections
+    are closed. The default collection is pinned and never evicted.
+    """
+
+    def __init__(self, default: RAGService, collections_dir: Optional[str] = None, memory_budget_mb: Optional[int] = None):
+        self.default = default
+        self.collections_dir = collections_dir or settings.COLLECTIONS_DIR
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else settings.COLLECTION_MEMORY_BUDGET_MB
+        self.memory_budget = budget_mb * 1024 * 1024
+        self._loaded: "OrderedDict[str, RAGService]" = OrderedDict()
+        self._active: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.evictions = 0
+
+    def validate_name(self, name: str) -> str:
+        if not _COLLECTION_NAME.match(name):
+            raise ValueError(
+                "Invalid collection name. Use 1-64 letters, digits, '-' or '_', starting with a letter or digit."
+            )
+        return name
+
+    def _collection_dir(self, name: str) -> str:
+        return os.path.join(self.collections_dir, name)
+
+    def exists(self, name: str) -> bool:
+        return name == self.default.name or os.path.isdir(self._collection_dir(name))
+
+    def list_collections(self) -> List[str]:
+        names = [self.default.name]
+        if os.path.isdir(self.collections_dir):
+            for name in sorted(os.listdir(self.collections_dir)):
+                if name not in names and _COLLECTION_NAME.match(name) and os.path.isdir(self._collection_dir(name)):
+                    names.append(name)
+        return names
+
+    async def get(self, name: Optional[str] = None, create: bool = False) -> RAGService:
+        """Return a loaded collection, loading it (and evicting others) if needed"""
+        name = self.validate_name(name or self.default.name)
+        if name == self.default.name:
+            return self.default
+
+        service = self._loaded.get(name)
+        if service is not None:
+            self._loaded.move_to_end(name)
+            return service
+
+        if not create and not self.exists(name):
+            raise CollectionNotFoundError(f"Collection '{name}' does not exist")
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            # Another request may have loaded it while we waited
+            service = self._loaded.get(name)
+            if service is None:
+                directory = self._collection_dir(name)
+                service = RAGService(
+                    name=name,
+                    resume_dir=os.path.join(directory, "resume"),
+                    vectorstore_dir=os.path.join(directory, "vectorstore")
+                )
+                print(f"📂 Loading collection '{name}'...")
+                await service.initialize()
+                self._loaded[name] = service
+            self._loaded.move_to_end(name)
+
+        self.evict()
+        return service
+
+    @asynccontextmanager
+    async def use(self, name: Optional[str] = None, create: bool = False) -> AsyncIterator[RAGService]:
+        """Hold a collection for the duration of a request so it is not evicted mid-use"""
+        service = await self.get(name, create=create)
+        self._active[service.name] = self._active.get(service.name, 0) + 1
+        try:
+            yield service
+        finally:
+            self._active[service.name] -= 1
+            if self._active[service.name] <= 0:
+                del self._active[service.name]
+            self.evict()
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.default.memory_bytes + sum(s.memory_bytes for s in self._loaded.values())
+
+    def evict(self) -> List[str]:
+        """Close least recently used idle collections until within the memory budget"""
+        evicted = []
+        for name in list(self._loaded):
+            if self.memory_bytes <= self.memory_budget:
+                break
+            # Keep collections in use and the most recently used one
+            if name in self._active or name == next(reversed(self._loaded)):
+                continue
+            service = self._loaded.pop(name)
+            service.close()
+            evicted.append(name)
+            self.evictions += 1
+            print(f"♻️ Evicted collection '{name}'")
+        return evicted
+
+    def get_stats(self) -> dict:
+        return {
+            "loaded": [self.default.name] + list(self._loaded),
+            "memory_bytes": self.memory_bytes,
+            "memory_budget_bytes": self.memory_budget,
+            "evictions": self.evictions,
+        }
+
+
+# Singleton instance
+collection_manager = CollectionManager(default=rag_service)
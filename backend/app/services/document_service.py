@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredMarkdownLoader
 from langchain.schema import Document
@@ -10,8 +10,8 @@ from app.config import settings
 class DocumentService:
     """Service for loading and processing resume documents"""
 
-    def __init__(self):
-        self.resume_dir = settings.RESUME_DIR
+    def __init__(self, resume_dir: Optional[str] = None):
+        self.resume_dir = resume_dir or settings.RESUME_DIR
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
         self.text_splitter = RecursiveCharacterTextSplitter(
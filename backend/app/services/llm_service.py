@@ -1,45 +1,61 @@
-import ollama
 from typing import List, Optional, AsyncGenerator
 import asyncio
+import threading
+
+import httpx
 
 from app.config import settings
 from app.models.schemas import ModelInfo
+from app.services.circuit_breaker import (
+    BackendConnectionError,
+    BackendTimeoutError,
+    BackendUnavailableError
+)
+from app.services.ollama_pool import CONNECTION_ERRORS, OllamaPool, generation_pool
+from app.services.profiling_service import run_in_executor_traced, trace_stage
 
 
 class LLMService:
     """Service for interacting with Ollama LLM"""
 
-    def __init__(self):
-        self.base_url = settings.OLLAMA_BASE_URL
+    def __init__(self, pool: Optional[OllamaPool] = None):
+        self.pool = pool or generation_pool
         self.default_model = settings.DEFAULT_MODEL
-        self._client = None
-
-    @property
-    def client(self):
-        if self._client is None:
-            self._client = ollama.Client(host=self.base_url)
-        return self._client
 
     async def check_connection(self) -> bool:
-        """Check if Ollama is running and accessible"""
+        """Check if at least one Ollama node is running and accessible"""
         try:
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.client.list)
-            return True
+            # Probes run in the thread pool to avoid blocking
+            return any(await self.pool.probe())
         except Exception as e:
             print(f"Ollama connection error: {e}")
             return False
 
     async def list_local_models(self) -> List[str]:
-        """List all models available locally in Ollama"""
-        try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, self.client.list)
-            return [model['name'].split(':')[0] for model in response.get('models', [])]
-        except Exception as e:
-            print(f"Error listing models: {e}")
-            return []
+        """List all models available locally on any healthy Ollama node"""
+        loop = asyncio.get_event_loop()
+        nodes = [node for node in self.pool.nodes if node.healthy]
+
+        # Nodes are asked concurrently with the short health-check timeout,
+        # so a hung node cannot hold worker threads for long
+        responses = await asyncio.gather(
+            *[loop.run_in_executor(None, node.probe_client.list) for node in nodes],
+            return_exceptions=True
+        )
+
+        names: List[str] = []
+        for node, response in zip(nodes, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                for model in response.get('models', []):
+                    name = model['name'].split(':')[0]
+                    if name not in names:
+                        names.append(name)
+            except Exception as e:
+                print(f"Error listing models on {node.base_url}: {e}")
+
+        return names
 
     async def get_available_models(self) -> List[ModelInfo]:
         """Get list of configured models with availability status"""
@@ -72,13 +88,13 @@ class LLMService:
         return models
 
     async def pull_model(self, model_name: str) -> bool:
-        """Pull a model from Ollama registry"""
+        """Pull a model from Ollama registry onto every node in the pool"""
         try:
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.client.pull(model_name)
-            )
+            await asyncio.gather(*[
+                loop.run_in_executor(None, lambda node=node: node.client.pull(model_name))
+                for node in self.pool.nodes
+            ])
             return True
         except Exception as e:
             print(f"Error pulling model {model_name}: {e}")
@@ -89,9 +105,10 @@ class LLMService:
         prompt: str,
         model: Optional[str] = None,
         system_prompt: Optional[str] = None,
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        history: Optional[List[dict]] = None
     ) -> str:
-        """Generate a response using the specified model"""
+        """Generate a response using the specified model (history: prior {role, content} turns)"""
         model = model or self.default_model
 
         # Build the full prompt with context if provided
@@ -109,15 +126,35 @@ Answer:"""
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
+        if history:
+            messages.extend(history)
         messages.append({"role": "user", "content": full_prompt})
 
+        breaker = self.pool.breaker
+        # Checked here too so calls fail fast instead of queueing for a worker thread
+        breaker.fail_fast()
+
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat(model=model, messages=messages)
+            # The timeout also bounds time spent queued behind other calls
+            response = await asyncio.wait_for(
+                run_in_executor_traced(
+                    "generation",
+                    lambda: self.pool.run(
+                        lambda node: node.client.chat(model=model, messages=messages),
+                        model=model
+                    ),
+                    executor=self.pool.executor
+                ),
+                timeout=self.pool.timeout
             )
             return response['message']['content']
+        except asyncio.TimeoutError:
+            raise BackendTimeoutError(
+                f"Generation with model {model} timed out after {self.pool.timeout}s",
+                retry_after=breaker.retry_after() or None
+            )
+        except BackendUnavailableError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating response with model {model}: {e}")
 
@@ -147,13 +184,61 @@ Answer:"""
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": full_prompt})
 
+        breaker = self.pool.breaker
+        breaker.fail_fast()
+
+        # The blocking Ollama stream is read on the pool's executor and chunks
+        # are handed back through a queue, so a slow node never blocks the loop
+        loop = asyncio.get_event_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        cancelled = threading.Event()
+
+        def read_stream():
+            try:
+                with breaker.guard(track_latency=False), self.pool.acquire(model) as node:
+                    for chunk in node.client.chat(model=model, messages=messages, stream=True):
+                        if cancelled.is_set():
+                            break
+                        if 'message' in chunk and 'content' in chunk['message']:
+                            loop.call_soon_threadsafe(queue.put_nowait, chunk['message']['content'])
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+            except httpx.TimeoutException:
+                loop.call_soon_threadsafe(queue.put_nowait, BackendTimeoutError(
+                    f"Streaming with model {model} timed out after {self.pool.timeout}s"
+                ))
+            except CONNECTION_ERRORS as e:
+                loop.call_soon_threadsafe(queue.put_nowait, BackendConnectionError(
+                    f"Lost connection to Ollama while streaming with model {model}: {e}"
+                ))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        deadline = loop.time() + self.pool.timeout if self.pool.timeout else None
+        loop.run_in_executor(self.pool.executor, read_stream)
         try:
-            stream = self.client.chat(model=model, messages=messages, stream=True)
-            for chunk in stream:
-                if 'message' in chunk and 'content' in chunk['message']:
-                    yield chunk['message']['content']
+            with trace_stage("generation"):
+                while True:
+                    remaining = deadline - loop.time() if deadline is not None else None
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        raise BackendTimeoutError(
+                            f"Streaming with model {model} timed out after {self.pool.timeout}s",
+                            retry_after=breaker.retry_after() or None
+                        )
+                    if item is finished:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        except BackendUnavailableError:
+            raise
         except Exception as e:
             raise Exception(f"Error in streaming response: {e}")
+        finally:
+            # Stops the reader at its next chunk if we gave up or the client went away
+            cancelled.set()
 
 
 # Singleton instance
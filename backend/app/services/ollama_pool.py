@@ -0,0 +1,330 @@
+import threading
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, TypeVar
+
+import httpx
+import ollama
+from langchain_core.embeddings import Embeddings
+
+from app.config import settings
+from app.services.circuit_breaker import BackendConnectionError, BackendTimeoutError, CircuitBreaker
+
+
+T = TypeVar("T")
+
+
+def parse_base_urls(value: str) -> List[str]:
+    """Split a comma-separated list of Ollama base URLs"""
+    urls = []
+    for url in value.split(","):
+        url = url.strip().rstrip("/")
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+class OllamaNode:
+    """A single Ollama endpoint and its routing state"""
+
+    def __init__(self, base_url: str, timeout: Optional[float] = None):
+        self.base_url = base_url
+        self.client = ollama.Client(host=base_url, timeout=timeout)
+        # Health probes get a short timeout so a hung node cannot stall /api/health
+        self.probe_client = ollama.Client(host=base_url, timeout=settings.OLLAMA_HEALTH_TIMEOUT)
+        self.in_flight = 0
+        self.failures = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.loaded_models: Set[str] = set()
+
+    def to_dict(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+
+# Failures that mean the node could not be reached (ollama maps ConnectError to ConnectionError)
+CONNECTION_ERRORS = (ConnectionError, httpx.TransportError)
+
+
+def is_client_error(error: Exception) -> bool:
+    """
+    An error Ollama answered with a 4xx status (e.g. unknown model)
+
+    These say nothing about node health. 5xx responses (runner crash, out of
+    memory) and errors reported mid-stream count as node failures.
+    """
+    return isinstance(error, ollama.ResponseError) and 400 <= error.status_code < 500
+
+
+class NoHealthyNodeError(BackendConnectionError):
+    """Raised when every node in a pool is ejected"""
+
+
+class OllamaPool:
+    """
+    Pool of Ollama endpoints with least-loaded routing
+
+    Requests go to the healthy node with the fewest in-flight requests.
+    Nodes that already served a model get an affinity bonus so the model
+    stays resident where it was loaded. Nodes failing with connection
+    errors are ejected for OLLAMA_EJECT_SECONDS and re-probed afterwards.
+
+    Each pool is one backend (generation or embedding) with its own request
+    timeout, circuit breaker and bounded executor, so a hung backend fails
+    fast instead of exhausting the default thread pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_urls: List[str],
+        timeout: Optional[float] = None,
+        latency_threshold: Optional[float] = None,
+        max_failures: Optional[int] = None,
+        eject_seconds: Optional[float] = None,
+        affinity_bonus: Optional[int] = None
+    ):
+        if not base_urls:
+            raise ValueError("Ollama pool needs at least one base URL")
+
+        self.name = name
+        self.timeout = timeout
+        self.nodes = [OllamaNode(url, timeout=timeout) for url in base_urls]
+        self.max_failures = max_failures or settings.OLLAMA_MAX_FAILURES
+        self.eject_seconds = eject_seconds if eject_seconds is not None else settings.OLLAMA_EJECT_SECONDS
+        self.affinity_bonus = affinity_bonus if affinity_bonus is not None else settings.OLLAMA_AFFINITY_BONUS
+        self._lock = threading.Lock()
+        self._probe_task: Optional[asyncio.Task] = None
+        self.breaker = CircuitBreaker(
+            name=f"Ollama {name}",
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.CIRCUIT_RESET_SECONDS,
+            latency_threshold=latency_threshold,
+            is_neutral=is_client_error
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.OLLAMA_MAX_CONCURRENCY,
+            thread_name_prefix=f"ollama-{name}"
+        )
+
+    @property
+    def base_urls(self) -> List[str]:
+        return [node.base_url for node in self.nodes]
+
+    def _select(self, model: Optional[str], exclude: Set[str]) -> OllamaNode:
+        """Pick the least-loaded healthy node (caller holds the lock)"""
+        now = time.monotonic()
+        candidates = [
+            node for node in self.nodes
+            if node.base_url not in exclude and (node.healthy or node.ejected_until <= now)
+        ]
+        if not candidates:
+            raise NoHealthyNodeError(
+                f"No healthy Ollama node available ({', '.join(self.base_urls)})",
+                retry_after=max(min(node.ejected_until for node in self.nodes) - now, 0.0) or None
+            )
+
+        def load(node: OllamaNode) -> int:
+            bonus = self.affinity_bonus if model and model in node.loaded_models else 0
+            return node.in_flight - bonus
+
+        # min() keeps configuration order on ties
+        return min(candidates, key=load)
+
+    @contextmanager
+    def acquire(self, model: Optional[str] = None, exclude: Optional[Set[str]] = None) -> Iterator[OllamaNode]:
+        """Reserve a node for the duration of one request"""
+        with self._lock:
+            node = self._select(model, exclude or set())
+            node.in_flight += 1
+
+        completed = False
+        failed = False
+        try:
+            yield node
+            completed = True
+        except Exception as e:
+            # A 4xx means the server answered, so the node itself is fine
+            failed = not is_client_error(e)
+            raise
+        finally:
+            self._release(node, model=model if completed else None, failed=failed)
+
+    def _release(self, node: OllamaNode, model: Optional[str] = None, failed: bool = False):
+        with self._lock:
+            node.in_flight -= 1
+            if failed:
+                self._mark_failure(node)
+            else:
+                self._mark_success(node)
+                if model:
+                    node.loaded_models.add(model)
+
+    def _mark_success(self, node: OllamaNode):
+        node.failures = 0
+        node.healthy = True
+        node.ejected_until = 0.0
+
+    def _mark_failure(self, node: OllamaNode):
+        node.failures += 1
+        # A node that is already ejected (re-probe failed) is ejected again
+        if node.failures >= self.max_failures or not node.healthy:
+            if node.healthy:
+                print(f"⚠️ Ejecting Ollama node {node.base_url} after {node.failures} failures")
+            node.healthy = False
+            node.ejected_until = time.monotonic() + self.eject_seconds
+
+    def run(self, fn: Callable[[OllamaNode], T], model: Optional[str] = None) -> T:
+        """
+        Run a blocking call against the pool
+
+        Connection-level failures are retried on the next node until every
+        node has been tried once, then raise BackendConnectionError; errors
+        reported by Ollama itself and timeouts are not retried. Fails fast
+        with CircuitOpenError while the backend's circuit is open.
+        """
+        with self.breaker.guard():
+            tried: Set[str] = set()
+            last_error: Optional[Exception] = None
+
+            while len(tried) < len(self.nodes):
+                try:
+                    with self.acquire(model, exclude=tried) as node:
+                        tried.add(node.base_url)
+                        return fn(node)
+                except NoHealthyNodeError:
+                    if last_error is None:
+                        raise
+                    break
+                except httpx.TimeoutException as e:
+                    raise BackendTimeoutError(
+                        f"Ollama {self.name} request to {node.base_url} timed out after {self.timeout}s"
+                    ) from e
+                except CONNECTION_ERRORS as e:
+                    last_error = e
+
+            raise BackendConnectionError(
+                f"Could not reach any Ollama {self.name} node ({', '.join(self.base_urls)}): {last_error}"
+            ) from last_error
+
+    def probe_node(self, node: OllamaNode) -> bool:
+        """Check a single node and update its health"""
+        try:
+            node.probe_client.list()
+        except Exception:
+            with self._lock:
+                self._mark_failure(node)
+            return False
+
+        with self._lock:
+            if not node.healthy:
+                print(f"✅ Ollama node {node.base_url} is back")
+            self._mark_success(node)
+        return True
+
+    async def probe(self, only_ejected: bool = False) -> List[bool]:
+        """Probe nodes concurrently and return their health"""
+        loop = asyncio.get_event_loop()
+        now = time.monotonic()
+        nodes = [
+            node for node in self.nodes
+            if not only_ejected or (not node.healthy and node.ejected_until <= now)
+        ]
+        await asyncio.gather(*[
+            loop.run_in_executor(None, self.probe_node, node) for node in nodes
+        ])
+        return [node.healthy for node in self.nodes]
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.eject_seconds)
+            try:
+                await self.probe(only_ejected=True)
+            except Exception as e:
+                print(f"Ollama probe error: {e}")
+
+    def start_health_checks(self):
+        """Start re-probing ejected nodes in the background"""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_event_loop().create_task(self._probe_loop())
+
+    async def stop_health_checks(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def get_stats(self) -> List[dict]:
+        with self._lock:
+            return [node.to_dict() for node in self.nodes]
+
+
+class PooledOllamaEmbeddings(Embeddings):
+    """
+    LangChain embeddings that route each call through an OllamaPool
+
+    Uses the same /api/embeddings endpoint and instruction prefixes as
+    langchain's OllamaEmbeddings, so existing indexes stay compatible, but
+    goes through the pool's clients and their timeouts.
+    """
+
+    EMBED_INSTRUCTION = "passage: "
+    QUERY_INSTRUCTION = "query: "
+
+    def __init__(self, pool: OllamaPool, model: str):
+        self.pool = pool
+        self.model = model
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        def embed(node: OllamaNode) -> List[List[float]]:
+            return [node.client.embeddings(model=self.model, prompt=text)["embedding"] for text in texts]
+
+        return self.pool.run(embed, model=self.model)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([f"{self.EMBED_INSTRUCTION}{text}" for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([f"{self.QUERY_INSTRUCTION}{text}"])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one pool call, identical to embed_query per text"""
+        return self._embed([f"{self.QUERY_INSTRUCTION}{text}" for text in texts])
+
+
+def _build_pools() -> Dict[str, OllamaPool]:
+    generation_urls = parse_base_urls(settings.OLLAMA_BASE_URL)
+    embedding_urls = parse_base_urls(settings.OLLAMA_EMBEDDING_BASE_URL) or generation_urls
+
+    # Separate pools even for the same nodes: each backend has its own
+    # timeout, circuit breaker and executor
+    generation = OllamaPool(
+        "generation",
+        generation_urls,
+        timeout=settings.OLLAMA_GENERATION_TIMEOUT,
+        latency_threshold=settings.CIRCUIT_GENERATION_LATENCY_SECONDS
+    )
+    embedding = OllamaPool(
+        "embedding",
+        embedding_urls,
+        timeout=settings.OLLAMA_EMBEDDING_TIMEOUT,
+        latency_threshold=settings.CIRCUIT_EMBEDDING_LATENCY_SECONDS
+    )
+    return {"generation": generation, "embedding": embedding}
+
+
+# Singleton instances
+_pools = _build_pools()
+generation_pool = _pools["generation"]
+embedding_pool = _pools["embedding"]
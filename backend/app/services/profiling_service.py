@@ -0,0 +1,272 @@
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+from app.config import settings
+
+
+T = TypeVar("T")
+
+
+class RequestTrace:
+    """Per-request stage timings, collected while the request runs"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def trace_stage(stage: str) -> Iterator[None]:
+    """Time a block of work and attribute it to the current request"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - start)
+
+
+async def run_in_executor_traced(stage: str, fn: Callable[[], T], executor: Optional[Executor] = None) -> T:
+    """
+    run_in_executor that records time spent queued for a worker thread
+    ("<stage>.executor_wait") separately from time spent running ("<stage>")
+    """
+    trace = _current_trace.get()
+    loop = asyncio.get_event_loop()
+    if trace is None:
+        return await loop.run_in_executor(executor, fn)
+
+    submitted = time.perf_counter()
+    started = [submitted]
+
+    def timed() -> T:
+        started[0] = time.perf_counter()
+        return fn()
+
+    try:
+        return await loop.run_in_executor(executor, timed)
+    finally:
+        finished = time.perf_counter()
+        trace.add(f"{stage}.executor_wait", started[0] - submitted)
+        trace.add(stage, finished - started[0])
+
+
+class StackSampler:
+    """Samples the stacks of every thread and aggregates them as collapsed stacks"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format, ready for flamegraph.pl / speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class ProfileCapture:
+    """A single on-demand profile that stops after N requests or T seconds"""
+
+    def __init__(self, mode: str, requests: Optional[int], seconds: Optional[float], interval_ms: float):
+        self.mode = mode
+        self.max_requests = requests
+        self.max_seconds = seconds
+        self.requests_seen = 0
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.finished_at: Optional[datetime] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        if mode == "cprofile":
+            # cProfile only sees the thread that enables it: the event loop
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(interval_ms / 1000.0)
+            self._sampler.start()
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def stop(self):
+        if not self.running:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.finished_at = datetime.now()
+
+    def status(self) -> dict:
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "requests_seen": self.requests_seen,
+            "max_requests": self.max_requests,
+            "max_seconds": self.max_seconds,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def result(self, fmt: str) -> bytes:
+        if self._sampler is not None:
+            if fmt != "collapsed":
+                raise ValueError("Sampling profiles are only available as 'collapsed'")
+            return self._sampler.collapsed().encode("utf-8")
+
+        self._profiler.create_stats()
+        if fmt == "pstats":
+            # Same format as Profile.dump_stats(); load with pstats.Stats(path)
+            return marshal.dumps(self._profiler.stats)
+        if fmt == "text":
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(50)
+            return out.getvalue().encode("utf-8")
+        raise ValueError("cProfile results are available as 'pstats' or 'text'")
+
+
+class ProfilingService:
+    """On-demand profiling and a ring buffer of slow request breakdowns"""
+
+    def __init__(self):
+        self.slow_threshold = settings.SLOW_REQUEST_THRESHOLD_MS / 1000.0
+        self.slow_requests: deque = deque(maxlen=settings.SLOW_REQUEST_BUFFER_SIZE)
+        self.capture: Optional[ProfileCapture] = None
+
+    def start_capture(
+        self,
+        mode: str = "sampling",
+        requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval_ms: float = 5.0
+    ) -> ProfileCapture:
+        if mode not in ("sampling", "cprofile"):
+            raise ValueError("mode must be 'sampling' or 'cprofile'")
+        if requests is None and seconds is None:
+            raise ValueError("Specify 'requests', 'seconds' or both")
+        if self.capture is not None and self.capture.running:
+            raise RuntimeError("A profile capture is already running")
+
+        seconds = min(seconds or settings.PROFILE_MAX_SECONDS, settings.PROFILE_MAX_SECONDS)
+        capture = ProfileCapture(mode, requests, seconds, interval_ms)
+        capture._timer = asyncio.get_event_loop().call_later(seconds, capture.stop)
+        self.capture = capture
+        return capture
+
+    def stop_capture(self) -> Optional[ProfileCapture]:
+        if self.capture is not None:
+            self.capture.stop()
+        return self.capture
+
+    def begin_request(self, method: str, path: str):
+        trace = RequestTrace(method, path)
+        return trace, _current_trace.set(trace)
+
+    def end_request(self, trace: RequestTrace, token, status: int):
+        _current_trace.reset(token)
+        duration = time.perf_counter() - trace.started
+
+        capture = self.capture
+        # Only requests that began after the capture started count towards N
+        if capture is not None and capture.running and trace.started >= capture.started:
+            capture.requests_seen += 1
+            if capture.max_requests is not None and capture.requests_seen >= capture.max_requests:
+                capture.stop()
+
+        if duration >= self.slow_threshold:
+            accounted = sum(trace.stages.values())
+            self.slow_requests.append({
+                "timestamp": datetime.now().isoformat(),
+                "method": trace.method,
+                "path": trace.path,
+                "status": status,
+                "duration_ms": round(duration * 1000, 2),
+                "stages_ms": {stage: round(seconds * 1000, 2) for stage, seconds in trace.stages.items()},
+                "unaccounted_ms": round(max(duration - accounted, 0.0) * 1000, 2),
+            })
+
+    def get_slow_requests(self, limit: Optional[int] = None) -> List[dict]:
+        """Most recent slow requests first"""
+        entries = list(reversed(self.slow_requests))
+        return entries[:limit] if limit else entries
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that traces HTTP requests until the last body chunk is sent"""
+
+    def __init__(self, app, service: "ProfilingService"):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = self.service.begin_request(scope["method"], scope["path"])
+        status = [500]
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            self.service.end_request(trace, token, status[0])
+
+
+# Singleton instance
+profiling_service = ProfilingService()
@@ -0,0 +1,223 @@
+import glob
+import json
+import os
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+
+# Number of set bits for every byte value, used for Hamming distances
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Rows scored per block, bounds the temporary memory of a brute-force scan
+_BLOCK_SIZE = 16384
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Points at the current version's files; replaced atomically after each build
+_MANIFEST = "manifest.json"
+
+
+class QuantizedIndex:
+    """
+    Compact in-memory vector index with full-precision rescoring
+
+    Only the quantized codes live in RAM:
+    - int8: one byte per dimension (scalar quantization with per-dimension range)
+    - binary: one bit per dimension (sign around the corpus mean), scanned by Hamming distance
+
+    Full-precision vectors are written to an .npy file and memory-mapped, so
+    only the rescored candidates are read from disk. Scores are squared L2
+    distances, the same as Chroma's default, so lower is better.
+
+    Every build writes new versioned files, so an index that is still being
+    searched keeps reading its own mapping while a rebuild runs; old files
+    are only removed (see remove_stale) once the new index is in use.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        documents: List[Document],
+        codes: np.ndarray,
+        vectors: np.ndarray,
+        offset: np.ndarray,
+        scale: Optional[np.ndarray] = None,
+        norms: Optional[np.ndarray] = None,
+        version: str = ""
+    ):
+        self.version = version
+        self.mode = mode
+        self.documents = documents
+        self.codes = codes
+        self.vectors = vectors
+        self.offset = offset
+        self.scale = scale
+        self.norms = norms
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        documents: List[Document],
+        mode: str,
+        storage_dir: str,
+        fingerprint: str = ""
+    ) -> "QuantizedIndex":
+        """
+        Quantize embeddings and persist codes and float vectors to storage_dir
+
+        `fingerprint` identifies the indexed corpus (e.g. a hash of chunk ids)
+        so load() can tell whether the persisted index is still current.
+        """
+        if mode not in QUANTIZATION_MODES or mode == "none":
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(documents):
+            raise ValueError("Embeddings must be a 2-D array with one row per document")
+
+        if mode == "int8":
+            low = vectors.min(axis=0)
+            high = vectors.max(axis=0)
+            scale = np.maximum(high - low, 1e-12) / 255.0
+            codes = (np.rint((vectors - low) / scale) - 128).astype(np.int8)
+            # Norms of the *decoded* vectors keep the approximate distance consistent
+            decoded = low + scale * (codes.astype(np.float32) + 128)
+            norms = np.einsum("ij,ij->i", decoded, decoded).astype(np.float32)
+            params = {"offset": low.astype(np.float32), "scale": scale.astype(np.float32), "norms": norms}
+        else:
+            params = {"offset": vectors.mean(axis=0).astype(np.float32)}
+            codes = np.packbits(vectors > params["offset"], axis=1)
+
+        version = uuid.uuid4().hex
+        os.makedirs(storage_dir, exist_ok=True)
+        vectors_path = os.path.join(storage_dir, f"vectors-{version}.f32.npy")
+        np.save(vectors_path, vectors)
+        np.savez(os.path.join(storage_dir, f"codes-{version}.npz"), codes=codes, **params)
+
+        manifest_tmp = os.path.join(storage_dir, f"{_MANIFEST}.{version}.tmp")
+        with open(manifest_tmp, "w") as f:
+            json.dump({"version": version, "mode": mode, "fingerprint": fingerprint, "count": len(documents)}, f)
+        os.replace(manifest_tmp, os.path.join(storage_dir, _MANIFEST))
+
+        return cls(mode, documents, codes, np.load(vectors_path, mmap_mode="r"), version=version, **params)
+
+    @classmethod
+    def load(
+        cls,
+        documents: List[Document],
+        mode: str,
+        storage_dir: str,
+        fingerprint: str
+    ) -> Optional["QuantizedIndex"]:
+        """Reopen the persisted index if it matches mode and fingerprint, else None"""
+        try:
+            with open(os.path.join(storage_dir, _MANIFEST)) as f:
+                manifest = json.load(f)
+            if (manifest["mode"], manifest["fingerprint"], manifest["count"]) != (mode, fingerprint, len(documents)):
+                return None
+            version = manifest["version"]
+            with np.load(os.path.join(storage_dir, f"codes-{version}.npz")) as data:
+                arrays = {key: data[key] for key in data.files}
+            vectors = np.load(os.path.join(storage_dir, f"vectors-{version}.f32.npy"), mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(mode, documents, vectors=vectors, version=version, **arrays)
+
+    @staticmethod
+    def remove_stale(storage_dir: str, keep_version: str):
+        """
+        Delete files of every version except keep_version
+
+        Call only after the new index has replaced the old one; an index that
+        still maps a deleted file keeps reading it until it is released.
+        """
+        patterns = ("vectors-*.f32.npy", "codes-*.npz", f"{_MANIFEST}.*.tmp", "vectors.f32.npy")
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(storage_dir, pattern)):
+                if keep_version and keep_version in os.path.basename(path):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def memory_bytes(self) -> int:
+        """RAM held by the codes and quantization parameters (excludes documents)"""
+        total = self.codes.nbytes + self.offset.nbytes
+        if self.scale is not None:
+            total += self.scale.nbytes
+        if self.norms is not None:
+            total += self.norms.nbytes
+        return total
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cheap distances for every stored vector and query, shape (n, q); lower is closer"""
+        if self.mode == "binary":
+            query_codes = np.packbits(queries > self.offset, axis=1)
+            scores = np.empty((len(self.codes), len(queries)), dtype=np.int32)
+            for start in range(0, len(self.codes), _BLOCK_SIZE):
+                block = self.codes[start:start + _BLOCK_SIZE]
+                for j, query_code in enumerate(query_codes):
+                    scores[start:start + _BLOCK_SIZE, j] = _POPCOUNT[np.bitwise_xor(block, query_code)].sum(axis=1)
+            return scores
+
+        # ||q - x||^2 = ||x||^2 - 2 q.x + const, with x = offset + scale * (code + 128)
+        weights = (queries * self.scale).T.astype(np.float32)
+        scores = np.empty((len(self.codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(self.codes), _BLOCK_SIZE):
+            block = self.codes[start:start + _BLOCK_SIZE].astype(np.float32)
+            scores[start:start + _BLOCK_SIZE] = block @ weights
+        return self.norms[:, None] - 2.0 * scores
+
+    def candidates(self, queries: np.ndarray, count: int) -> np.ndarray:
+        """Indices of the `count` best approximate matches per query, shape (count, q)"""
+        scores = self._approximate_scores(queries)
+        count = min(count, len(scores))
+        if count == len(scores):
+            return np.tile(np.arange(count)[:, None], (1, len(queries)))
+        return np.argpartition(scores, count - 1, axis=0)[:count]
+
+    def search(self, query_embedding: List[float], k: int, rescore_factor: int = 4) -> List[Tuple[Document, float]]:
+        """Prefilter on the codes, then rescore candidates with float vectors"""
+        return self.search_batch([query_embedding], k, rescore_factor)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int,
+        rescore_factor: int = 4
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search several queries with one matrix-matrix pass over the codes and candidates"""
+        if len(self) == 0 or len(query_embeddings) == 0:
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        candidates = self.candidates(queries, k * max(rescore_factor, 1))
+
+        # Rescore the union of all candidates at once; sorted ids keep the
+        # memory-mapped reads sequential
+        union = np.unique(candidates)
+        exact = np.asarray(self.vectors[union], dtype=np.float32)
+        distances = (
+            np.einsum("ij,ij->i", exact, exact)[:, None]
+            - 2.0 * (exact @ queries.T)
+            + np.einsum("ij,ij->i", queries, queries)[None, :]
+        )
+
+        results = []
+        for j in range(len(queries)):
+            rows = np.searchsorted(union, candidates[:, j])
+            column = distances[rows, j]
+            order = np.argsort(column)[:k]
+            results.append([
+                (self.documents[union[rows[i]]], float(max(column[i], 0.0))) for i in order
+            ])
+        return results
@@ -3,36 +3,65 @@ import os
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
 os.environ["CHROMA_TELEMETRY"] = "False"
 
-from typing import List, Tuple, Optional
+from typing import AsyncGenerator, Dict, List, Tuple, Optional
 import asyncio
+import hashlib
+import uuid
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain.schema import Document
 
 from app.config import settings
-from app.services.document_service import document_service
+from app.services.circuit_breaker import BackendUnavailableError
+from app.services.document_service import DocumentService, document_service
 from app.services.llm_service import llm_service
+from app.services.ollama_pool import PooledOllamaEmbeddings, embedding_pool
+from app.services.quantized_index import QuantizedIndex
+from app.services.profiling_service import run_in_executor_traced, trace_stage
+from app.services.session_service import ChatSession
+
+
+RESUME_SYSTEM_PROMPT = """You are a helpful assistant that answers questions about a person's resume/CV.
+Answer based ONLY on the provided context. If the information is not in the context, say so.
+Be concise but informative. Answer in the same language as the question."""
+
+# Metadata key holding the Chroma id of a chunk on results from vector search
+CHUNK_ID_KEY = "chunk_id"
+
+DEGRADED_ANSWER_HEADER = """The language model is temporarily unavailable, so here are the most relevant excerpts from the resume instead:"""
 
 
 class RAGService:
     """RAG (Retrieval-Augmented Generation) service for resume Q&A"""
 
-    def __init__(self):
-        self.vectorstore_dir = settings.VECTORSTORE_DIR
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        resume_dir: Optional[str] = None,
+        vectorstore_dir: Optional[str] = None
+    ):
+        self.name = name or settings.DEFAULT_COLLECTION
+        self.vectorstore_dir = vectorstore_dir or settings.VECTORSTORE_DIR
+        self.document_service = DocumentService(resume_dir) if resume_dir else document_service
         self.embedding_model = settings.EMBEDDING_MODEL
         self.top_k = settings.TOP_K_RESULTS
         self._vectorstore: Optional[Chroma] = None
-        self._embeddings: Optional[OllamaEmbeddings] = None
+        self._embeddings: Optional[PooledOllamaEmbeddings] = None
+        self.quantization = settings.VECTOR_QUANTIZATION
+        self._quantized: Optional[QuantizedIndex] = None
         self._initialized = False
+        self._memory_bytes = 0
+        self._index_lock = asyncio.Lock()
+        # Changes whenever the index is (re)loaded, so callers can invalidate cached chunk ids
+        self.index_version = ""
 
     @property
-    def embeddings(self) -> OllamaEmbeddings:
-        """Lazy initialization of embeddings"""
+    def embeddings(self) -> PooledOllamaEmbeddings:
+        """Lazy initialization of embeddings (routed through the embedding pool)"""
         if self._embeddings is None:
-            self._embeddings = OllamaEmbeddings(
-                base_url=settings.OLLAMA_BASE_URL,
+            self._embeddings = PooledOllamaEmbeddings(
+                pool=embedding_pool,
                 model=self.embedding_model
             )
         return self._embeddings
@@ -42,7 +71,7 @@ class RAGService:
         try:
             # Ensure directories exist
             os.makedirs(self.vectorstore_dir, exist_ok=True)
-            os.makedirs(settings.RESUME_DIR, exist_ok=True)
+            os.makedirs(self.resume_dir, exist_ok=True)
 
             # Check if vectorstore already exists
             if self._check_existing_vectorstore():
@@ -50,13 +79,13 @@ class RAGService:
                 await self._load_vectorstore()
             else:
                 # Try to index documents if any exist
-                doc_count = document_service.get_document_count()
+                doc_count = self.document_service.get_document_count()
                 if doc_count > 0:
                     print(f"📄 Found {doc_count} documents, indexing...")
                     await self.index_documents()
                 else:
                     print("⚠️ No documents found in resume directory")
-                    print(f"   Please add documents to: {settings.RESUME_DIR}")
+                    print(f"   Please add documents to: {self.resume_dir}")
 
             self._initialized = True
             return True
@@ -65,6 +94,10 @@ class RAGService:
             print(f"❌ RAG initialization error: {e}")
             return False
 
+    @property
+    def resume_dir(self) -> str:
+        return self.document_service.resume_dir
+
     def _check_existing_vectorstore(self) -> bool:
         """Check if a vectorstore already exists"""
         chroma_dir = os.path.join(self.vectorstore_dir, "chroma.sqlite3")
@@ -77,6 +110,10 @@ class RAGService:
             allow_reset=True
         ))
 
+    def _chroma_settings(self) -> ChromaSettings:
+        """Persistent Chroma settings, one Chroma system per vectorstore directory"""
+        return ChromaSettings(anonymized_telemetry=False, is_persistent=True)
+
     async def _load_vectorstore(self):
         """Load existing vectorstore from disk"""
         loop = asyncio.get_event_loop()
@@ -85,66 +122,292 @@ class RAGService:
             lambda: Chroma(
                 persist_directory=self.vectorstore_dir,
                 embedding_function=self.embeddings,
-                client_settings=ChromaSettings(anonymized_telemetry=False)
+                client_settings=self._chroma_settings()
             )
         )
+        await self._build_quantized_index(reuse=True)
+        await self._measure_memory()
+        self.index_version = uuid.uuid4().hex
 
-    async def index_documents(self) -> int:
-        """Index all documents from the resume directory"""
-        # Load and split documents
-        chunks = document_service.load_and_split()
+    async def _measure_memory(self, chroma_resident: bool = False):
+        """
+        Estimate resident memory of the loaded index
 
-        if not chunks:
-            print("⚠️ No document chunks to index")
-            return 0
+        Without quantization: Chroma's float vectors plus chunk text. With it:
+        the quantized codes plus the chunk text they keep, and Chroma's vectors
+        only when chroma_resident (the collection was indexed by this process,
+        so Chroma still holds its vector index in memory).
+        """
+        quantized = self._quantized
+
+        def measure() -> int:
+            collection = self._vectorstore._collection
+            count = collection.count()
+            if count == 0:
+                return 0
+            sample = collection.peek(1)
+            dim = len(sample["embeddings"][0]) if sample["embeddings"] is not None else 0
+            if quantized is None:
+                return count * (dim * 4 + settings.CHUNK_SIZE)
+
+            text_bytes = sum(len(doc.page_content.encode("utf-8")) for doc in quantized.documents)
+            total = quantized.memory_bytes + text_bytes
+            if chroma_resident:
+                total += count * dim * 4
+            return total
 
-        # Create or update vectorstore
+        if self._vectorstore is None:
+            self._memory_bytes = 0
+            return
         loop = asyncio.get_event_loop()
+        self._memory_bytes = await loop.run_in_executor(None, measure)
 
-        print(f"🔄 Creating embeddings for {len(chunks)} chunks...")
-        self._vectorstore = await loop.run_in_executor(
-            None,
-            lambda: Chroma.from_documents(
-                documents=chunks,
-                embedding=self.embeddings,
-                persist_directory=self.vectorstore_dir,
-                client_settings=ChromaSettings(anonymized_telemetry=False)
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def close(self):
+        """Release the vectorstore and in-memory indexes"""
+        vectorstore = self._vectorstore
+        self._vectorstore = None
+        self._quantized = None
+        self._memory_bytes = 0
+        self._initialized = False
+
+        if vectorstore is not None:
+            self._close_client(vectorstore)
+
+    def _close_client(self, vectorstore: Chroma):
+        """Release the vectorstore's reference on the shared per-directory Chroma system"""
+        # Client.close() (chromadb >= 1.0) stops the system once no client uses it
+        close = getattr(vectorstore._client, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing vectorstore {self.name}: {e}")
+
+    async def _build_quantized_index(self, reuse: bool = False):
+        """
+        Build the quantized index from the vectors stored in Chroma
+
+        With reuse=True (loading an existing vectorstore) the persisted index
+        is reopened instead when it was built from the same chunks.
+        """
+        if self.quantization == "none" or self._vectorstore is None:
+            self._quantized = None
+            return
+
+        storage_dir = os.path.join(self.vectorstore_dir, "quantized")
+
+        def build() -> Tuple[Optional[QuantizedIndex], bool]:
+            data = self._vectorstore._collection.get(include=["documents", "metadatas"])
+            if not data["ids"]:
+                return None, False
+            documents = [
+                Document(page_content=text or "", metadata={**(metadata or {}), CHUNK_ID_KEY: chunk_id})
+                for chunk_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+            ]
+            fingerprint = hashlib.sha256("\n".join(data["ids"]).encode("utf-8")).hexdigest()
+
+            if reuse:
+                index = QuantizedIndex.load(documents, self.quantization, storage_dir, fingerprint)
+                if index is not None:
+                    return index, True
+
+            # Fetched in the same order as the ids above
+            embeddings = self._vectorstore._collection.get(ids=data["ids"], include=["embeddings"])
+            order = {chunk_id: i for i, chunk_id in enumerate(embeddings["ids"])}
+            vectors = [embeddings["embeddings"][order[chunk_id]] for chunk_id in data["ids"]]
+            index = QuantizedIndex.build(
+                embeddings=vectors,
+                documents=documents,
+                mode=self.quantization,
+                storage_dir=storage_dir,
+                fingerprint=fingerprint
             )
-        )
+            return index, False
+
+        loop = asyncio.get_event_loop()
+        index, reused = await loop.run_in_executor(None, build)
+        # Swap first: searches holding the previous index keep their own mapping
+        self._quantized = index
+        if index is None:
+            return
 
-        print(f"✅ Indexed {len(chunks)} chunks")
-        return len(chunks)
+        await loop.run_in_executor(None, QuantizedIndex.remove_stale, storage_dir, index.version)
+        action = "Loaded" if reused else "Built"
+        print(f"🗜️ {action} {self.quantization} index for {len(index)} vectors "
+              f"({index.memory_bytes / 1024:.1f} KiB of codes)")
+
+    async def index_documents(self) -> int:
+        """
+        Index all documents from the resume directory
+
+        Chunks are embedded before the current index is touched, so a failed
+        re-index (e.g. embedding backend down) keeps serving the old one.
+        Concurrent re-indexes of the same collection run one at a time.
+        """
+        async with self._index_lock:
+            # Load and split documents
+            chunks = self.document_service.load_and_split()
+
+            if not chunks:
+                print("⚠️ No document chunks to index")
+                return 0
+
+            loop = asyncio.get_event_loop()
+
+            embedding_pool.breaker.fail_fast()
+            print(f"🔄 Creating embeddings for {len(chunks)} chunks...")
+            vectors = await loop.run_in_executor(
+                embedding_pool.executor,
+                self.embeddings.embed_documents,
+                [chunk.page_content for chunk in chunks]
+            )
+
+            if self._vectorstore is None and self._check_existing_vectorstore():
+                await self._load_vectorstore()
+            previous = self._vectorstore
+
+            def replace() -> Chroma:
+                # Drop the previous index so re-indexing does not duplicate chunks
+                if previous is not None:
+                    previous.delete_collection()
+                vectorstore = Chroma(
+                    persist_directory=self.vectorstore_dir,
+                    embedding_function=self.embeddings,
+                    client_settings=self._chroma_settings()
+                )
+                batch_size = vectorstore._client.get_max_batch_size()
+                for start in range(0, len(chunks), batch_size):
+                    batch = chunks[start:start + batch_size]
+                    vectorstore._collection.add(
+                        ids=[str(uuid.uuid4()) for _ in batch],
+                        embeddings=vectors[start:start + batch_size],
+                        documents=[chunk.page_content for chunk in batch],
+                        metadatas=[chunk.metadata or None for chunk in batch]
+                    )
+                return vectorstore
+
+            self._vectorstore = await loop.run_in_executor(None, replace)
+            if previous is not None:
+                # The new Chroma instance opened its own client; drop the old reference
+                self._close_client(previous)
+
+            await self._build_quantized_index()
+            await self._measure_memory(chroma_resident=True)
+            self.index_version = uuid.uuid4().hex
+
+            print(f"✅ Indexed {len(chunks)} chunks")
+            return len(chunks)
+
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed queries on the embedding pool's executor
+
+        Keeps embedding calls within OLLAMA_MAX_CONCURRENCY and off the default
+        executor, and fails fast while the embedding circuit is open.
+        """
+        embedding_pool.breaker.fail_fast()
+        if len(queries) <= 1:
+            return await run_in_executor_traced(
+                "embedding",
+                lambda: self.embeddings.embed_queries(queries),
+                executor=embedding_pool.executor
+            )
+
+        # /api/embeddings takes one text per request, so slices of the batch run
+        # in parallel workers and the pool routes each to the least-loaded node
+        parts = min(len(queries), settings.OLLAMA_MAX_CONCURRENCY)
+        size = -(-len(queries) // parts)
+        loop = asyncio.get_event_loop()
+        with trace_stage("embedding"):
+            embedded = await asyncio.gather(*[
+                loop.run_in_executor(embedding_pool.executor, self.embeddings.embed_queries, queries[i:i + size])
+                for i in range(0, len(queries), size)
+            ])
+        return [vector for part in embedded for vector in part]
 
     async def search(self, query: str, top_k: Optional[int] = None) -> List[Tuple[Document, float]]:
         """Search for relevant documents"""
         if self._vectorstore is None:
             return []
 
+        query_embeddings = await self.embed_queries([query])
+        return (await self.search_by_vectors(query_embeddings, top_k))[0]
+
+    async def search_batch(
+        self,
+        queries: List[str],
+        top_k: Optional[int] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several queries at once
+
+        Queries are embedded in parallel slices (see embed_queries) and
+        retrieved in one pass: a matrix-matrix scan over the quantized index,
+        or one batched Chroma query otherwise.
+        """
+        if self._vectorstore is None or not queries:
+            return [[] for _ in queries]
+
+        query_embeddings = await self.embed_queries(queries)
+        return await self.search_by_vectors(query_embeddings, top_k)
+
+    async def search_by_vectors(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: Optional[int] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search with precomputed query embeddings; results carry their chunk id in metadata"""
+        if self._vectorstore is None or not query_embeddings:
+            return [[] for _ in query_embeddings]
+
         k = top_k or self.top_k
+        if self._quantized is not None:
+            index = self._quantized
+            return await run_in_executor_traced(
+                "retrieval",
+                lambda: index.search_batch(
+                    query_embeddings,
+                    k=k,
+                    rescore_factor=settings.QUANTIZATION_RESCORE_FACTOR
+                )
+            )
 
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None,
-            lambda: self._vectorstore.similarity_search_with_score(query, k=k)
+        results = await run_in_executor_traced(
+            "retrieval",
+            lambda: self._vectorstore._collection.query(
+                query_embeddings=query_embeddings,
+                n_results=k,
+                include=["documents", "metadatas", "distances"]
+            )
         )
+        return [
+            [
+                (Document(page_content=text or "", metadata={**(metadata or {}), CHUNK_ID_KEY: chunk_id}), distance)
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
 
-        return results
-
-    async def query(
+    async def answer(
         self,
         question: str,
+        search_results: List[Tuple[Document, float]],
         model: Optional[str] = None,
-        top_k: Optional[int] = None
-    ) -> Tuple[str, List[str]]:
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Tuple[str, List[str], bool]:
         """
-        Query the RAG system with a question
+        Generate an answer from already retrieved context (and prior conversation turns)
 
-        Returns:
-            Tuple of (answer, list of source documents)
+        Returns (answer, sources, degraded). While generation is unavailable,
+        DEGRADED_MODE "snippets" answers with the top retrieved chunks and
+        degraded=True; "fail_fast" re-raises BackendUnavailableError.
         """
-        # Search for relevant context
-        search_results = await self.search(question, top_k)
-
         sources = []
         context_parts = []
 
@@ -156,28 +419,125 @@ class RAGService:
 
         context = "\n\n---\n\n".join(context_parts) if context_parts else ""
 
-        # Generate system prompt for resume Q&A
-        system_prompt = """You are a helpful assistant that answers questions about a person's resume/CV.
-Answer based ONLY on the provided context. If the information is not in the context, say so.
-Be concise but informative. Answer in the same language as the question."""
-
         # Generate response
-        if context:
+        if not context:
+            answer = "I don't have any resume information loaded yet. Please upload a resume document first."
+            return answer, sources, False
+
+        try:
             answer = await llm_service.generate(
                 prompt=question,
                 model=model,
-                system_prompt=system_prompt,
-                context=context
+                system_prompt=RESUME_SYSTEM_PROMPT,
+                context=context,
+                history=history
             )
-        else:
-            answer = "I don't have any resume information loaded yet. Please upload a resume document first."
+        except BackendUnavailableError:
+            if settings.DEGRADED_MODE != "snippets":
+                raise
+            return self.snippet_answer(search_results), sources, True
+
+        return answer, sources, False
+
+    @staticmethod
+    def snippet_answer(search_results: List[Tuple[Document, float]]) -> str:
+        """Retrieval-only answer: the top chunks, quoted with their source"""
+        snippets = [
+            f"[{doc.metadata.get('source', 'Unknown')}]\n{doc.page_content.strip()}"
+            for doc, _ in search_results[:settings.DEGRADED_SNIPPETS]
+        ]
+        return "\n\n".join([DEGRADED_ANSWER_HEADER] + snippets)
+
+    async def query(
+        self,
+        question: str,
+        model: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> Tuple[str, List[str], bool]:
+        """
+        Query the RAG system with a question
 
-        return answer, sources
+        Returns:
+            Tuple of (answer, list of source documents, degraded)
+        """
+        # Search for relevant context
+        search_results = await self.search(question, top_k)
+        return await self.answer(question, search_results, model)
+
+    async def query_session(
+        self,
+        session: ChatSession,
+        question: str,
+        model: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> Tuple[str, List[str], bool]:
+        """
+        Answer a follow-up turn of a server-side session
+
+        A question the session has already asked reuses its chunks without
+        embedding or retrieval; after a re-index its cached embedding is
+        reused and only the vector search runs. Degraded (retrieval-only)
+        answers are not added to the history.
+        """
+        session.sync_index(self.index_version, self.embedding_model)
+
+        search_results = session.cached_results(question)
+        if search_results is None:
+            embedding = session.cached_embedding(question)
+            if embedding is None:
+                embedding = (await self.embed_queries([question]))[0]
+            search_results = (await self.search_by_vectors([embedding], top_k))[0]
+            session.remember(question, embedding, search_results, id_key=CHUNK_ID_KEY)
+
+        history = session.history[-settings.SESSION_MAX_HISTORY_MESSAGES:]
+        answer, sources, degraded = await self.answer(question, search_results, model, history=history)
+        if not degraded:
+            session.add_turn(question, answer)
+        return answer, sources, degraded
+
+    async def query_batch(
+        self,
+        questions: List[str],
+        model: Optional[str] = None,
+        top_k: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        search_results: Optional[List[List[Tuple[Document, float]]]] = None
+    ) -> AsyncGenerator[Tuple[int, str, List[str], bool, Optional[str]], None]:
+        """
+        Answer several questions with shared retrieval and bounded generation
+
+        Yields (index, answer, sources, degraded, error) as each answer
+        completes; a failed generation yields an error instead of stopping
+        the batch, except BackendUnavailableError (DEGRADED_MODE=fail_fast),
+        which is raised. Pass search_results to reuse an earlier search_batch.
+        Unfinished generations are cancelled when the consumer stops.
+        """
+        if search_results is None:
+            search_results = await self.search_batch(questions, top_k)
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_MAX_CONCURRENCY)
+
+        async def run(index: int):
+            async with semaphore:
+                try:
+                    answer, sources, degraded = await self.answer(questions[index], search_results[index], model)
+                    return index, answer, sources, degraded, None
+                except BackendUnavailableError:
+                    raise
+                except Exception as e:
+                    return index, "", [], False, str(e)
+
+        tasks = [asyncio.ensure_future(run(i)) for i in range(len(questions))]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
 
     def get_stats(self) -> dict:
         """Get statistics about the RAG system"""
-        doc_count = document_service.get_document_count()
-        docs = document_service.list_documents()
+        doc_count = self.document_service.get_document_count()
+        docs = self.document_service.list_documents()
 
         chunk_count = 0
         if self._vectorstore is not None:
@@ -188,11 +548,13 @@ Be concise but informative. Answer in the same language as the question."""
                 pass
 
         return {
+            "collection": self.name,
             "initialized": self._initialized,
             "documents_count": doc_count,
             "documents": docs,
             "chunks_count": chunk_count,
-            "vectorstore_ready": self._vectorstore is not None
+            "vectorstore_ready": self._vectorstore is not None,
+            "quantization": self.quantization if self._quantized is not None else "none"
         }
 
 
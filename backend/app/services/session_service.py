@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import json
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+from langchain.schema import Document
+
+from app.config import settings
+
+
+T = TypeVar("T")
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question.strip().lower())
+
+
+class ChatSession:
+    """
+    Server-side conversation state
+
+    Keeps the recent history, the embeddings of questions already asked and
+    the chunks they retrieved, so follow-up turns only send the new message
+    and repeated questions skip embedding and retrieval. After a re-index
+    the chunks are dropped but the embeddings (float32 bytes) are kept, so
+    a repeated question only runs the vector search again.
+    """
+
+    def __init__(self, session_id: str, collection: str):
+        self.session_id = session_id
+        self.collection = collection
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.history: List[Dict[str, str]] = []
+        # Index the cached chunks came from; a re-index invalidates them
+        self.index_version = ""
+        # Model the cached embeddings came from; a new model invalidates them
+        self.embedding_model = ""
+        # chunk id -> {"page_content", "metadata"}
+        self.chunks: Dict[str, dict] = {}
+        # normalized question -> {"embedding": float32 bytes, "results": [[chunk id, score], ...] or None}
+        self.queries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def add_turn(self, question: str, answer: str):
+        self.history.append({"role": "user", "content": question})
+        self.history.append({"role": "assistant", "content": answer})
+        del self.history[:-settings.SESSION_MAX_HISTORY_MESSAGES]
+
+    def sync_index(self, index_version: str, embedding_model: str):
+        """Drop cached results if the collection was re-indexed, and embeddings if the model changed"""
+        if self.embedding_model != embedding_model:
+            self.queries.clear()
+            self.embedding_model = embedding_model
+        if self.index_version != index_version:
+            self.chunks.clear()
+            for entry in self.queries.values():
+                entry["results"] = None
+            self.index_version = index_version
+
+    def cached_embedding(self, question: str) -> Optional[List[float]]:
+        entry = self.queries.get(normalize_question(question))
+        return np.frombuffer(entry["embedding"], dtype=np.float32).tolist() if entry else None
+
+    def cached_results(self, question: str) -> Optional[List[Tuple[Document, float]]]:
+        """Results of an earlier identical question on the current index, if every chunk is still held"""
+        key = normalize_question(question)
+        entry = self.queries.get(key)
+        if entry is None or entry["results"] is None:
+            return None
+        if any(chunk_id not in self.chunks for chunk_id, _ in entry["results"]):
+            return None
+        self.queries.move_to_end(key)
+        return [
+            (Document(page_content=self.chunks[chunk_id]["page_content"],
+                      metadata=self.chunks[chunk_id]["metadata"]), score)
+            for chunk_id, score in entry["results"]
+        ]
+
+    def remember(self, question: str, embedding: List[float], results: List[Tuple[Document, float]], id_key: str):
+        key = normalize_question(question)
+        entries = []
+        for doc, score in results:
+            chunk_id = doc.metadata.get(id_key)
+            if chunk_id is None:
+                continue
+            self.chunks[chunk_id] = {"page_content": doc.page_content, "metadata": doc.metadata}
+            entries.append([chunk_id, float(score)])
+
+        self.queries[key] = {"embedding": np.asarray(embedding, dtype=np.float32).tobytes(), "results": entries}
+        self.queries.move_to_end(key)
+        while len(self.queries) > settings.SESSION_MAX_CACHED_QUERIES:
+            self.queries.popitem(last=False)
+
+        # Only keep chunks that a cached question still refers to
+        referenced = {
+            chunk_id for entry in self.queries.values() for chunk_id, _ in (entry["results"] or [])
+        }
+        for chunk_id in list(self.chunks):
+            if chunk_id not in referenced:
+                del self.chunks[chunk_id]
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "collection": self.collection,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "history": self.history,
+            "index_version": self.index_version,
+            "embedding_model": self.embedding_model,
+            "chunks": self.chunks,
+            "queries": [
+                [key, {**entry, "embedding": base64.b64encode(entry["embedding"]).decode("ascii")}]
+                for key, entry in self.queries.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChatSession":
+        session = cls(data["session_id"], data["collection"])
+        session.created_at = data["created_at"]
+        session.last_used = data["last_used"]
+        session.history = data["history"]
+        session.index_version = data["index_version"]
+        session.embedding_model = data.get("embedding_model", "")
+        session.chunks = data["chunks"]
+        session.queries = OrderedDict(
+            (key, {**entry, "embedding": base64.b64decode(entry["embedding"])})
+            for key, entry in data["queries"]
+        )
+        return session
+
+
+class SessionStore:
+    """
+    In-memory session store with TTL and LRU eviction
+
+    When SESSION_SQLITE_PATH is set, sessions evicted for space are spilled
+    to SQLite and transparently reloaded on their next turn; expired sessions
+    are dropped in both places. SQLite work runs in the default executor.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        sqlite_path: Optional[str] = None
+    ):
+        self.max_sessions = max_sessions or settings.SESSION_MAX_SESSIONS
+        self.ttl = ttl_seconds or settings.SESSION_TTL_SECONDS
+        self.sqlite_path = sqlite_path if sqlite_path is not None else settings.SESSION_SQLITE_PATH
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+        self.spilled = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Lazy initialization of the SQLite spill (caller holds _db_lock)"""
+        if self._db is None:
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, last_used REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._db_lock:
+            db = self._connect()
+            cursor = db.execute(sql, params)
+            db.commit()
+            return cursor
+
+    async def _run_db(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_event_loop().run_in_executor(None, fn, *args)
+
+    def _expired(self, session: ChatSession, now: float) -> bool:
+        return now - session.last_used > self.ttl
+
+    async def _purge_expired(self, now: float):
+        # The dict is kept in last-used order, so expired sessions are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if not self._expired(session, now):
+                break
+            self._sessions.popitem(last=False)
+
+        if self.sqlite_path:
+            await self._run_db(self._execute, "DELETE FROM sessions WHERE last_used < ?", (now - self.ttl,))
+
+    async def _spill(self, session: ChatSession):
+        if not self.sqlite_path:
+            return
+        # Serialized here so the worker thread never reads a session in use
+        data = json.dumps(session.to_dict())
+        await self._run_db(
+            self._execute,
+            "INSERT OR REPLACE INTO sessions (session_id, last_used, data) VALUES (?, ?, ?)",
+            (session.session_id, session.last_used, data)
+        )
+        self.spilled += 1
+
+    def _take_spilled(self, session_id: str) -> Optional[str]:
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None:
+                db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                db.commit()
+        return row[0] if row else None
+
+    async def _load_spilled(self, session_id: str) -> Optional[ChatSession]:
+        if not self.sqlite_path:
+            return None
+        async with self._load_lock:
+            # Another request may have reloaded it while we waited
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return session
+            data = await self._run_db(self._take_spilled, session_id)
+        return ChatSession.from_dict(json.loads(data)) if data else None
+
+    async def _put(self, session: ChatSession):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            await self._spill(evicted)
+
+    async def create(self, collection: str) -> ChatSession:
+        await self._purge_expired(time.time())
+        session = ChatSession(secrets.token_urlsafe(16), collection)
+        await self._put(session)
+        return session
+
+    async def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return a live session (reloading it from SQLite if spilled), or None"""
+        now = time.time()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = await self._load_spilled(session_id)
+        if session is None:
+            return None
+        if self._expired(session, now):
+            self._sessions.pop(session_id, None)
+            return None
+
+        session.last_used = now
+        await self._put(session)
+        return session
+
+    async def delete(self, session_id: str) -> bool:
+        found = self._sessions.pop(session_id, None) is not None
+        if self.sqlite_path:
+            cursor = await self._run_db(self._execute, "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            found = found or cursor.rowcount > 0
+        return found
+
+    def get_stats(self) -> dict:
+        return {
+            "in_memory": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "spilled": self.spilled,
+        }
+
+    def close(self):
+        """Spill every in-memory session (if SQLite is configured) and close the database"""
+        if not self.sqlite_path:
+            return
+        for session in self._sessions.values():
+            self._execute(
+                "INSERT OR REPLACE INTO sessions (session_id, last_used, data) VALUES (?, ?, ?)",
+                (session.session_id, session.last_used, json.dumps(session.to_dict()))
+            )
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Singleton instance
+session_store = SessionStore()
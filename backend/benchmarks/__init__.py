@@ -0,0 +1 @@
+# Microbenchmark regression suite
@@ -0,0 +1,58 @@
+"""
+Shared fixtures and hooks for the microbenchmark suite (test doubles live in
+benchmarks/helpers.py)
+
+Nothing here talks to Ollama: embeddings are deterministic hash vectors and
+the LLM pool returns a canned answer, so timings measure only our own code.
+
+Slowdown threshold: comparing against a saved baseline fails when a
+benchmark regresses by more than BENCHMARK_MAX_SLOWDOWN (default
+"mean:20%"), unless --benchmark-compare-fail is passed explicitly.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from pytest_benchmark.utils import parse_compare_fail
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the app away from real data and Ollama nodes while importing settings
+os.environ.setdefault("OLLAMA_BASE_URL", "http://127.0.0.1:9")
+
+from benchmarks.helpers import StubEmbeddings, StubPool  # noqa: E402
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if config.option.benchmark_compare and not config.option.benchmark_compare_fail:
+        threshold = os.environ.get("BENCHMARK_MAX_SLOWDOWN", "mean:20%")
+        try:
+            config.option.benchmark_compare_fail = [parse_compare_fail(threshold)]
+        except Exception:
+            raise pytest.UsageError(
+                f"Invalid BENCHMARK_MAX_SLOWDOWN {threshold!r}; expected e.g. 'mean:20%' or 'min:0.001'"
+            )
+
+
+@pytest.fixture
+def run_async():
+    """Run a coroutine factory to completion on a dedicated event loop"""
+    loop = asyncio.new_event_loop()
+
+    def run(factory):
+        return loop.run_until_complete(factory())
+
+    yield run
+    loop.close()
+
+
+@pytest.fixture
+def stub_embeddings() -> StubEmbeddings:
+    return StubEmbeddings()
+
+
+@pytest.fixture
+def stub_pool() -> StubPool:
+    return StubPool()
@@ -0,0 +1,80 @@
+"""
+Test doubles and data shared by the microbenchmarks
+
+Embeddings are deterministic hash vectors and the LLM pool returns a canned
+answer, so nothing here talks to Ollama.
+"""
+import hashlib
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from app.services.circuit_breaker import CircuitBreaker
+
+
+EMBEDDING_DIM = 256
+
+
+class StubEmbeddings(Embeddings):
+    """Deterministic pseudo-embeddings derived from the text hash"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        values = []
+        seed = text.encode("utf-8")
+        while len(values) < self.dim:
+            seed = hashlib.sha256(seed).digest()
+            values.extend((b - 127.5) / 127.5 for b in seed)
+        return values[:self.dim]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+class StubClient:
+    """Stands in for ollama.Client; returns a canned chat answer"""
+
+    def chat(self, model, messages, stream=False):
+        return {"message": {"role": "assistant", "content": "stub answer"}}
+
+
+class StubNode:
+    base_url = "http://stub"
+    healthy = True
+
+    def __init__(self):
+        self.client = StubClient()
+
+
+class StubPool:
+    """Stands in for OllamaPool with a single in-process node"""
+
+    def __init__(self):
+        self.nodes = [StubNode()]
+        self.timeout = None
+        self.executor = None
+        self.breaker = CircuitBreaker("stub", failure_threshold=5, reset_seconds=30.0)
+
+    def run(self, fn, model=None):
+        return fn(self.nodes[0])
+
+
+def synthetic_resume(index: int, paragraphs: int = 40) -> str:
+    """A resume-shaped document of roughly 20 KB"""
+    parts = [f"# Candidate {index}"]
+    for p in range(paragraphs):
+        parts.append(
+            f"## Role {p} at Company {index}-{p}\n"
+            f"Led a team of {p % 7 + 2} engineers building distributed systems in Python and Go. "
+            f"Reduced p99 latency by {p % 40 + 10}% through caching, batching and profiling. "
+            f"Mentored interns, ran design reviews and owned the on-call rotation for service {p}."
+        )
+    return "\n\n".join(parts)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark quantized retrieval against the full-precision baseline
+
+Reports, for a synthetic clustered corpus:
+- RAM per 100k vectors (codes only, float vectors stay on disk)
+- mean query latency
+- recall@k against exact float32 brute-force search
+
+    python benchmarks/quantization_report.py --vectors 100000 --dim 768 --k 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.schema import Document
+
+from app.services.quantized_index import QuantizedIndex
+
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Gaussian clusters, roughly shaped like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    distances = np.einsum("ij,ij->i", vectors - query, vectors - query)
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768, help="nomic-embed-text produces 768 dimensions")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Building corpus: {args.vectors} x {args.dim}")
+    vectors = make_corpus(args.vectors, args.dim, args.clusters, args.seed)
+    # Queries are perturbed corpus points, so each has a meaningful nearest neighbourhood
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, args.vectors, size=args.queries)
+    queries = vectors[picks] + 0.3 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    documents = [Document(page_content=str(i), metadata={"id": i}) for i in range(args.vectors)]
+    per_100k = 100_000 / args.vectors
+
+    # Float baseline: the whole matrix in RAM, exact brute force
+    start = time.perf_counter()
+    truth = [exact_top_k(vectors, q, args.k) for q in queries]
+    float_latency = (time.perf_counter() - start) / args.queries
+
+    rows = [("float32", "-", vectors.nbytes * per_100k, float_latency, 1.0)]
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        for mode in ("int8", "binary"):
+            index = QuantizedIndex.build(vectors, documents, mode, os.path.join(storage_dir, mode))
+            memory = index.memory_bytes * per_100k
+
+            for factor in args.rescore_factor:
+                hits = 0
+                start = time.perf_counter()
+                for query, expected in zip(queries, truth):
+                    results = index.search(query, args.k, rescore_factor=factor)
+                    found = {doc.metadata["id"] for doc, _ in results}
+                    hits += len(found & set(expected.tolist()))
+                latency = (time.perf_counter() - start) / args.queries
+                rows.append((mode, factor, memory, latency, hits / (args.queries * args.k)))
+
+    print()
+    print(f"{'mode':<8} {'rescore':>7} {'MiB/100k':>10} {'latency ms':>11} {'recall@' + str(args.k):>9}")
+    for mode, factor, memory, latency, recall in rows:
+        print(f"{mode:<8} {str(factor):>7} {memory / 2**20:>10.1f} {latency * 1000:>11.2f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+from langchain.schema import Document
+
+from app.main import app
+from app.services.llm_service import llm_service
+from app.services.rag_service import rag_service
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """App client with retrieval and generation stubbed (lifespan is not run)"""
+    results = [
+        (Document(page_content=f"Chunk {i} of the resume.", metadata={"source": "resume.md"}), 0.1 * i)
+        for i in range(5)
+    ]
+
+    async def search(query, top_k=None):
+        return results
+
+    async def generate(prompt, model=None, system_prompt=None, context=None, history=None):
+        return "stub answer"
+
+    monkeypatch.setattr(rag_service, "search", search)
+    monkeypatch.setattr(llm_service, "generate", generate)
+    return TestClient(app)
+
+
+def test_chat_endpoint_overhead(benchmark, client):
+    payload = {
+        "message": "What is your work experience?",
+        "model": "qwen3:1.7b",
+        "chat_history": [
+            {"role": "user", "content": f"Question {i}"} for i in range(10)
+        ],
+    }
+
+    response = benchmark(client.post, "/api/chat", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "stub answer"
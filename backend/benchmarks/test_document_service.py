@@ -0,0 +1,22 @@
+import pytest
+from langchain.schema import Document
+
+from app.services.document_service import DocumentService
+from benchmarks.helpers import synthetic_resume
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """200 resumes of ~20 KB each (~4 MB of text)"""
+    return [
+        Document(page_content=synthetic_resume(i), metadata={"source": f"resume_{i}.md"})
+        for i in range(200)
+    ]
+
+
+def test_split_documents(benchmark, corpus, tmp_path):
+    service = DocumentService(resume_dir=str(tmp_path))
+
+    chunks = benchmark(service.split_documents, corpus)
+
+    assert len(chunks) > len(corpus)
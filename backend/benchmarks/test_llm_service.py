@@ -0,0 +1,16 @@
+from app.services.llm_service import LLMService
+from benchmarks.helpers import synthetic_resume
+
+
+def test_generate_prompt_construction(benchmark, stub_pool, run_async):
+    service = LLMService(pool=stub_pool)
+    context = "\n\n---\n\n".join(synthetic_resume(i, paragraphs=2) for i in range(5))
+
+    answer = benchmark(run_async, lambda: service.generate(
+        prompt="Summarise the candidate's leadership experience.",
+        model="qwen3:1.7b",
+        system_prompt="You answer questions about a resume.",
+        context=context
+    ))
+
+    assert answer == "stub answer"
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.services.rag_service import RAGService
+from benchmarks.helpers import StubEmbeddings, synthetic_resume
+
+
+QUESTIONS = [
+    "Where did the candidate work most recently?",
+    "Which programming languages does the candidate use?",
+    "Has the candidate led a team?",
+    "What latency improvements were delivered?",
+]
+
+
+@pytest.fixture(scope="module", params=["none", "int8", "binary"])
+def indexed_service(request, tmp_path_factory):
+    """A collection of 20 resumes indexed with stub embeddings"""
+    root = tmp_path_factory.mktemp(f"rag-{request.param}")
+    resume_dir = root / "resume"
+    resume_dir.mkdir()
+    for i in range(20):
+        (resume_dir / f"resume_{i}.txt").write_text(synthetic_resume(i), encoding="utf-8")
+
+    service = RAGService(
+        name=f"bench-{request.param}",
+        resume_dir=str(resume_dir),
+        vectorstore_dir=str(root / "vectorstore")
+    )
+    service._embeddings = StubEmbeddings()
+    service.quantization = request.param
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(service.index_documents())
+    loop.close()
+
+    yield service
+    service.close()
+
+
+def test_search(benchmark, indexed_service, run_async):
+    results = benchmark(run_async, lambda: indexed_service.search(QUESTIONS[0]))
+
+    assert len(results) == indexed_service.top_k
+
+
+def test_search_batch(benchmark, indexed_service, run_async):
+    questions = QUESTIONS * 12
+
+    results = benchmark(run_async, lambda: indexed_service.search_batch(questions))
+
+    assert len(results) == len(questions)
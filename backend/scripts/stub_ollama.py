@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the Ollama HTTP API, for exercising pool routing locally
+
+Starts one stub server per port. Each answers /api/tags, /api/chat,
+/api/embed, /api/embeddings and /api/pull, and tags its chat answers
+with the port it runs on so you can see where requests were routed.
+
+    python scripts/stub_ollama.py --ports 11501 11502 11503 --latency 0.5
+    OLLAMA_BASE_URL=http://localhost:11501,http://localhost:11502,http://localhost:11503 python run.py
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    """Deterministic pseudo-embedding derived from the text hash"""
+    values = []
+    seed = text.encode("utf-8")
+    while len(values) < dim:
+        seed = hashlib.sha256(seed).digest()
+        values.extend((b - 127.5) / 127.5 for b in seed)
+    return values[:dim]
+
+
+def make_handler(port: int, latency: float, dim: int, models: list):
+    class StubOllamaHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            print(f"[stub:{port}] {format % args}")
+
+        def _send(self, payload: dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send({"models": [{"name": m, "model": m} for m in models]})
+            else:
+                self._send({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            payload = self._read_json()
+            model = payload.get("model", "")
+
+            if self.path == "/api/chat":
+                time.sleep(latency)
+                question = payload.get("messages", [{}])[-1].get("content", "")
+                self._send({
+                    "model": model,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {
+                        "role": "assistant",
+                        "content": f"[stub:{port}] {len(question)} chars received",
+                    },
+                    "done": True,
+                })
+            elif self.path == "/api/embeddings":
+                self._send({"embedding": fake_embedding(payload.get("prompt", ""), dim)})
+            elif self.path == "/api/embed":
+                inputs = payload.get("input", [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                self._send({"model": model, "embeddings": [fake_embedding(t, dim) for t in inputs]})
+            elif self.path == "/api/pull":
+                self._send({"status": "success"})
+            else:
+                self._send({"error": "not found"}, status=404)
+
+    return StubOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ports", type=int, nargs="+", default=[11501, 11502])
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to sleep per chat request")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--models", nargs="+", default=["qwen3:1.7b", "nomic-embed-text:latest"])
+    args = parser.parse_args()
+
+    servers = []
+    for port in args.ports:
+        server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(port, args.latency, args.dim, args.models))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        print(f"Stub Ollama listening on http://localhost:{port}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Shared fixtures for the unit tests
+
+These cover the pure-logic state machines (circuit breaker, node ejection,
+collection eviction, session TTL/LRU/spill) with a fake clock and no Ollama.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the app away from real data and Ollama nodes while importing settings
+os.environ.setdefault("OLLAMA_BASE_URL", "http://127.0.0.1:9")
+
+
+class FakeClock:
+    """Stands in for the time module; only moves when advanced"""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def run_async():
+    """Run a coroutine factory to completion on a dedicated event loop"""
+    loop = asyncio.new_event_loop()
+
+    def run(factory):
+        return loop.run_until_complete(factory())
+
+    yield run
+    loop.close()
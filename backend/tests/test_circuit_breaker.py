@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class NeutralError(Exception):
+    pass
+
+
+@pytest.fixture
+def breaker(clock, monkeypatch) -> CircuitBreaker:
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return CircuitBreaker(
+        "test",
+        failure_threshold=3,
+        reset_seconds=10.0,
+        latency_threshold=1.0,
+        is_neutral=lambda e: isinstance(e, NeutralError)
+    )
+
+
+def fail(breaker: CircuitBreaker, error: Exception = None):
+    with pytest.raises(type(error or RuntimeError())):
+        with breaker.guard():
+            raise error or RuntimeError("down")
+
+
+def test_opens_after_consecutive_failures(breaker):
+    fail(breaker)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == pytest.approx(10.0)
+
+
+def test_success_resets_failure_count(breaker):
+    fail(breaker)
+    fail(breaker)
+    with breaker.guard():
+        pass
+    fail(breaker)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
+
+
+def test_half_open_lets_one_trial_through_and_success_closes(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    clock.advance(10.0)
+
+    assert breaker.allows_calls()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # A second caller is rejected while the trial is in flight
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_half_open_failure_reopens(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    clock.advance(10.0)
+
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(10.0)
+
+
+def test_cancelled_trial_releases_the_slot(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    clock.advance(10.0)
+
+    with pytest.raises(asyncio.CancelledError):
+        with breaker.guard():
+            raise asyncio.CancelledError()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+
+
+def test_slow_call_counts_as_failure(breaker, clock):
+    for _ in range(3):
+        with breaker.guard():
+            clock.advance(2.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_slow_call_ignored_without_latency_tracking(breaker, clock):
+    for _ in range(3):
+        with breaker.guard(track_latency=False):
+            clock.advance(2.0)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_neutral_errors_count_as_success(breaker):
+    fail(breaker)
+    fail(breaker)
+    fail(breaker, NeutralError("unknown model"))
+    fail(breaker)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
+
+
+def test_fail_fast_does_not_take_the_trial_slot(breaker, clock):
+    for _ in range(3):
+        fail(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.fail_fast()
+
+    clock.advance(10.0)
+    breaker.fail_fast()
+    breaker.fail_fast()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
@@ -0,0 +1,80 @@
+import pytest
+
+from app.services import collection_service
+from app.services.collection_service import CollectionManager
+
+MB = 1024 * 1024
+
+
+class FakeCollection:
+    """Stands in for RAGService with a fixed memory footprint"""
+
+    def __init__(self, name: str, memory_bytes: int = MB, **dirs):
+        self.name = name
+        self.memory_bytes = memory_bytes
+        self.closed = False
+
+    async def initialize(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(collection_service, "RAGService", FakeCollection)
+
+    def make(budget_mb: int, default_bytes: int = 0) -> CollectionManager:
+        default = FakeCollection("default", memory_bytes=default_bytes)
+        return CollectionManager(default, collections_dir=str(tmp_path), memory_budget_mb=budget_mb)
+
+    return make
+
+
+def test_evicts_least_recently_used(make_manager, run_async):
+    manager = make_manager(budget_mb=2)
+
+    async def scenario():
+        a = await manager.get("a", create=True)
+        b = await manager.get("b", create=True)
+        await manager.get("a")
+        c = await manager.get("c", create=True)
+        return a, b, c
+
+    a, b, c = run_async(scenario)
+
+    assert b.closed and not a.closed and not c.closed
+    assert manager.get_stats()["loaded"] == ["default", "a", "c"]
+    assert manager.evictions == 1
+
+
+def test_default_collection_is_pinned(make_manager, run_async):
+    manager = make_manager(budget_mb=1, default_bytes=5 * MB)
+
+    async def scenario():
+        a = await manager.get("a", create=True)
+        await manager.get("b", create=True)
+        return a
+
+    a = run_async(scenario)
+
+    # Still over budget, but the default and the latest collection stay
+    assert a.closed and not manager.default.closed
+    assert manager.get_stats()["loaded"] == ["default", "b"]
+
+
+def test_collections_in_use_are_not_evicted(make_manager, run_async):
+    manager = make_manager(budget_mb=1)
+
+    async def scenario():
+        async with manager.use("a", create=True) as a:
+            await manager.get("b", create=True)
+            assert not a.closed
+        return a
+
+    a = run_async(scenario)
+
+    # Evicted once the request holding it is done
+    assert a.closed
+    assert manager.get_stats()["loaded"] == ["default", "b"]
@@ -0,0 +1,132 @@
+import ollama
+import pytest
+
+from app.services import circuit_breaker, ollama_pool
+from app.services.circuit_breaker import BackendConnectionError
+from app.services.ollama_pool import NoHealthyNodeError, OllamaPool
+
+
+class FakeProbeClient:
+    def __init__(self, up: bool = True):
+        self.up = up
+
+    def list(self):
+        if not self.up:
+            raise ConnectionError("probe failed")
+        return {"models": []}
+
+
+@pytest.fixture
+def pool(clock, monkeypatch) -> OllamaPool:
+    monkeypatch.setattr(ollama_pool, "time", clock)
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    pool = OllamaPool(
+        "test",
+        ["http://a", "http://b"],
+        max_failures=2,
+        eject_seconds=30.0,
+        affinity_bonus=0
+    )
+    yield pool
+    pool.executor.shutdown(wait=False)
+
+
+def node_down(base_url: str):
+    """A call that fails to connect on one node and succeeds elsewhere"""
+    calls = []
+
+    def call(node):
+        calls.append(node.base_url)
+        if node.base_url == base_url:
+            raise ConnectionError(f"{node.base_url} refused")
+        return node.base_url
+
+    return call, calls
+
+
+def test_connection_errors_fail_over_and_eject(pool):
+    a, b = pool.nodes
+    call, calls = node_down("http://a")
+
+    assert pool.run(call) == "http://b"
+    assert a.healthy and a.failures == 1
+
+    pool.run(call)
+    assert not a.healthy
+
+    # Ejected nodes are skipped without being tried
+    calls.clear()
+    assert pool.run(call) == "http://b"
+    assert calls == ["http://b"]
+    assert pool.breaker.failures == 0
+
+
+def test_ejected_node_is_readmitted_after_eject_seconds(pool, clock):
+    a, _ = pool.nodes
+    call, _ = node_down("http://a")
+    pool.run(call)
+    pool.run(call)
+
+    clock.advance(30.0)
+    assert pool.run(lambda node: node.base_url) == "http://a"
+    assert a.healthy and a.failures == 0
+
+
+def test_probe_readmits_or_re_ejects(pool, clock):
+    a, _ = pool.nodes
+    call, _ = node_down("http://a")
+    pool.run(call)
+    pool.run(call)
+    clock.advance(30.0)
+
+    a.probe_client = FakeProbeClient(up=False)
+    assert not pool.probe_node(a)
+    # A failed re-probe ejects again right away
+    assert a.ejected_until == pytest.approx(clock.now + 30.0)
+
+    a.probe_client = FakeProbeClient(up=True)
+    assert pool.probe_node(a)
+    assert a.healthy and a.ejected_until == 0.0
+
+
+def test_server_errors_count_against_the_node(pool):
+    a, _ = pool.nodes
+
+    def crash(node):
+        raise ollama.ResponseError("runner crashed", 500)
+
+    for _ in range(2):
+        with pytest.raises(ollama.ResponseError):
+            pool.run(crash)
+
+    assert not a.healthy
+    assert pool.breaker.failures == 2
+
+
+def test_client_errors_are_neutral(pool):
+    a, _ = pool.nodes
+
+    def unknown_model(node):
+        raise ollama.ResponseError("model not found", 404)
+
+    for _ in range(5):
+        with pytest.raises(ollama.ResponseError):
+            pool.run(unknown_model)
+
+    assert a.healthy and a.failures == 0
+    assert pool.breaker.failures == 0
+
+
+def test_all_nodes_down(pool, clock):
+    def refuse(node):
+        raise ConnectionError("refused")
+
+    for _ in range(2):
+        with pytest.raises(BackendConnectionError):
+            pool.run(refuse)
+    assert not any(node.healthy for node in pool.nodes)
+
+    clock.advance(10.0)
+    with pytest.raises(NoHealthyNodeError) as excinfo:
+        pool.run(refuse)
+    assert excinfo.value.retry_after == pytest.approx(20.0)
@@ -0,0 +1,115 @@
+import pytest
+
+from app.services import session_service
+from app.services.session_service import SessionStore
+
+
+@pytest.fixture
+def make_store(clock, monkeypatch, tmp_path):
+    monkeypatch.setattr(session_service, "time", clock)
+    stores = []
+
+    def make(max_sessions: int = 10, spill: bool = False) -> SessionStore:
+        store = SessionStore(
+            max_sessions=max_sessions,
+            ttl_seconds=60.0,
+            sqlite_path=str(tmp_path / "sessions.db") if spill else ""
+        )
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_sessions_expire_after_idle_ttl(make_store, clock, run_async):
+    store = make_store()
+    session = run_async(lambda: store.create("default"))
+
+    # Each turn refreshes the TTL
+    clock.advance(50.0)
+    assert run_async(lambda: store.get(session.session_id)) is session
+    clock.advance(50.0)
+    assert run_async(lambda: store.get(session.session_id)) is session
+
+    clock.advance(61.0)
+    assert run_async(lambda: store.get(session.session_id)) is None
+
+
+def test_least_recently_used_dropped_without_spill(make_store, run_async):
+    store = make_store(max_sessions=2)
+
+    async def scenario():
+        first = await store.create("default")
+        second = await store.create("default")
+        await store.get(first.session_id)
+        await store.create("default")
+        return first, second
+
+    first, second = run_async(scenario)
+
+    assert run_async(lambda: store.get(first.session_id)) is first
+    assert run_async(lambda: store.get(second.session_id)) is None
+    assert store.spilled == 0
+
+
+def test_evicted_sessions_spill_and_reload(make_store, run_async):
+    store = make_store(max_sessions=1, spill=True)
+
+    async def scenario():
+        first = await store.create("default")
+        first.add_turn("Where did you study?", "At the university.")
+        second = await store.create("default")
+        return first, second
+
+    first, second = run_async(scenario)
+    assert store.spilled == 1
+    assert store.get_stats()["in_memory"] == 1
+
+    reloaded = run_async(lambda: store.get(first.session_id))
+    assert reloaded is not first
+    assert reloaded.history == first.history
+    # Reloading pushed the other session out in turn
+    assert store.spilled == 2
+    assert run_async(lambda: store.get(second.session_id)).session_id == second.session_id
+
+
+def test_expired_spilled_sessions_are_purged(make_store, clock, run_async):
+    store = make_store(max_sessions=1, spill=True)
+
+    async def scenario():
+        first = await store.create("default")
+        await store.create("default")
+        return first
+
+    first = run_async(scenario)
+    clock.advance(61.0)
+    run_async(lambda: store.create("default"))
+
+    assert run_async(lambda: store.get(first.session_id)) is None
+
+
+def test_delete_removes_spilled_sessions(make_store, run_async):
+    store = make_store(max_sessions=1, spill=True)
+
+    async def scenario():
+        first = await store.create("default")
+        await store.create("default")
+        return first
+
+    first = run_async(scenario)
+
+    assert run_async(lambda: store.delete(first.session_id))
+    assert not run_async(lambda: store.delete(first.session_id))
+    assert run_async(lambda: store.get(first.session_id)) is None
+
+
+def test_close_persists_sessions_for_the_next_store(make_store, run_async):
+    store = make_store(spill=True)
+    session = run_async(lambda: store.create("default"))
+    session.add_turn("Hi", "Hello")
+    store.close()
+
+    reopened = make_store(spill=True)
+    assert run_async(lambda: reopened.get(session.session_id)).history == session.history